@@ -0,0 +1,162 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from dotenv import load_dotenv
+from loguru import logger
+from fastapi.responses import JSONResponse
+
+load_dotenv()
+
+# Admission limits per endpoint and worker: requests processed at once, requests allowed to wait,
+# and how long one may wait before it is turned away. Queue timeouts leave each request enough of
+# the frontend's timeout (120s for parsing and chunking, 60s for extraction) to complete.
+PARSE_MAX_CONCURRENT = int(os.getenv("PARSE_MAX_CONCURRENT", "2"))
+PARSE_MAX_QUEUED = int(os.getenv("PARSE_MAX_QUEUED", "8"))
+PARSE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PARSE_QUEUE_TIMEOUT_SECONDS", "30"))
+CHUNK_MAX_CONCURRENT = int(os.getenv("CHUNK_MAX_CONCURRENT", "4"))
+CHUNK_MAX_QUEUED = int(os.getenv("CHUNK_MAX_QUEUED", "16"))
+CHUNK_QUEUE_TIMEOUT_SECONDS = float(os.getenv("CHUNK_QUEUE_TIMEOUT_SECONDS", "30"))
+EXTRACT_MAX_CONCURRENT = int(os.getenv("EXTRACT_MAX_CONCURRENT", "8"))
+EXTRACT_MAX_QUEUED = int(os.getenv("EXTRACT_MAX_QUEUED", "32"))
+EXTRACT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_QUEUE_TIMEOUT_SECONDS", "10"))
+# Whole-document pipeline runs (/process-pdf), each with its own stage threads
+PIPELINE_MAX_CONCURRENT = int(os.getenv("PIPELINE_MAX_CONCURRENT", "1"))
+PIPELINE_MAX_QUEUED = int(os.getenv("PIPELINE_MAX_QUEUED", "4"))
+PIPELINE_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PIPELINE_QUEUE_TIMEOUT_SECONDS", "30"))
+# Upper bound for Retry-After: estimates from long service times (whole-document runs) or long
+# queues are not worth committing a client to
+MAX_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_MAX_RETRY_AFTER_SECONDS", "60"))
+
+
+class Overloaded(Exception):
+    """A request turned away: 429 when the queue is full, 503 when it waited past the queue timeout"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Lets at most `max_concurrent` requests run at once; up to `max_queued` more wait in FIFO order,
+    each for at most `queue_timeout` seconds. Anything beyond that is rejected right away, with a
+    Retry-After estimated from the recent service time, so accepted requests keep a predictable latency.
+    Used from the event loop only (one limiter per worker process).
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queued: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._service_time: float | None = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+        }
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new request has likely drained (at most MAX_RETRY_AFTER_SECONDS)"""
+        service_time = self._service_time or 1.0
+        estimate = math.ceil(service_time * (self.queued + 1) / self.max_concurrent)
+        return min(max(estimate, 1), MAX_RETRY_AFTER_SECONDS)
+
+    async def acquire(self) -> float:
+        """Waits for a slot; returns when it was granted (for release). Raises Overloaded."""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return time.monotonic()
+        if self.queued >= self.max_queued:
+            raise Overloaded(f"{self.name} is at capacity, try again later", 429, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended: pass it on
+                self._hand_off()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise Overloaded(
+                f"{self.name} is overloaded (queued for {self.queue_timeout:.0f}s), try again later",
+                503, self.retry_after()
+            ) from None
+        return time.monotonic()
+
+    def release(self, started: float) -> None:
+        elapsed = time.monotonic() - started
+        self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+        self._hand_off()
+
+    def _hand_off(self) -> None:
+        # Hand the slot straight to the next waiter, so newcomers can't overtake the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+parse_limiter = AdmissionLimiter("parse-pdf", PARSE_MAX_CONCURRENT, PARSE_MAX_QUEUED, PARSE_QUEUE_TIMEOUT_SECONDS)
+chunk_limiter = AdmissionLimiter("chunk-sections", CHUNK_MAX_CONCURRENT, CHUNK_MAX_QUEUED, CHUNK_QUEUE_TIMEOUT_SECONDS)
+extract_limiter = AdmissionLimiter("extract-chunk", EXTRACT_MAX_CONCURRENT, EXTRACT_MAX_QUEUED, EXTRACT_QUEUE_TIMEOUT_SECONDS)
+pipeline_limiter = AdmissionLimiter("process-pdf", PIPELINE_MAX_CONCURRENT, PIPELINE_MAX_QUEUED, PIPELINE_QUEUE_TIMEOUT_SECONDS)
+
+# POST paths under admission control; the streaming extraction shares the extraction limit
+ADMISSION_LIMITERS = {
+    "/parse-pdf": parse_limiter,
+    "/chunk-sections": chunk_limiter,
+    "/extract-chunk": extract_limiter,
+    "/extract-chunk/stream": extract_limiter,
+    "/process-pdf": pipeline_limiter,
+}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying ADMISSION_LIMITERS. A slot is held until the response is fully sent,
+    so streamed responses count for as long as they stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limiter = ADMISSION_LIMITERS.get(scope["path"])
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            started = await limiter.acquire()
+        except Overloaded as e:
+            logger.warning(f"Rejected {scope['path']} with {e.status_code}: {e}")
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": str(e)},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(started)
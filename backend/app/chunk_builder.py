@@ -1,24 +1,54 @@
-from llama_index.core import Document
-from llama_index.core.node_parser import SemanticSplitterNodeParser
-from llama_index.embeddings.openai import OpenAIEmbedding
 import os
 import re
+import uuid
+from functools import lru_cache
+import numpy as np
 from dotenv import load_dotenv
-from loguru import logger
+from .rate_limit import get_http_client
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Alternative OpenAI-compatible endpoint (e.g. the load-test stub); unset means api.openai.com
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 
-# Initialize embedding model and semantic splitter
-embed_model = OpenAIEmbedding(
-    model="text-embedding-3-large", # Changed from 'small'
-    dimensions=3072,                # Explicitly set higher dimensions
-    api_key=OPENAI_API_KEY
-)
-semantic_splitter = SemanticSplitterNodeParser(
-    buffer_size=1,              # Sentences to group for comparison
-    breakpoint_percentile_threshold=95,  # Higher = fewer splits
-    embed_model=embed_model
+
+# llama_index is heavy to import, so the embedding model and splitter are built on first use
+@lru_cache(maxsize=1)
+def get_embed_model():
+    from llama_index.embeddings.openai import OpenAIEmbedding
+
+    return OpenAIEmbedding(
+        model="text-embedding-3-large", # Changed from 'small'
+        dimensions=3072,                # Explicitly set higher dimensions
+        api_key=OPENAI_API_KEY,
+        api_base=OPENAI_BASE_URL,
+        http_client=get_http_client()
+    )
+
+
+@lru_cache(maxsize=1)
+def get_semantic_splitter():
+    from llama_index.core.node_parser import SemanticSplitterNodeParser
+
+    return SemanticSplitterNodeParser(
+        buffer_size=1,              # Sentences to group for comparison
+        breakpoint_percentile_threshold=95,  # Higher = fewer splits
+        embed_model=get_embed_model()
+    )
+
+
+# Section headers in the converted markdown
+# Pattern 1: Standard markdown headers (# ## ###)
+# Pattern 2: Bold text on its own line - handles both single and multi-bold patterns
+#   - Single: **Introduction**
+#   - Multi:  **3** **Model Architecture** or **3.1** **Encoder Stacks**
+HEADER_PATTERN = re.compile(
+    r'^(?:'
+    r'(#{1,3})\s+(.+)'                              # Group 1,2: Markdown headers (# Title)
+    r'|'
+    r'(\*\*[^*\n]+\*\*(?:\s+\*\*[^*\n]+\*\*)*)\s*$' # Group 3: One or more bold blocks
+    r')',
+    re.MULTILINE
 )
 
 
@@ -31,20 +61,7 @@ def extract_sections_from_markdown(markdown_text: str) -> list[dict]:
       - Multi-bold headers: **3** **Model Architecture** (numbered sections)
     Returns a list of dicts: [{'section': 'Introduction', 'text': '...'}, ...]
     """
-    # Pattern 1: Standard markdown headers (# ## ###)
-    # Pattern 2: Bold text on its own line - handles both single and multi-bold patterns
-    #   - Single: **Introduction**
-    #   - Multi:  **3** **Model Architecture** or **3.1** **Encoder Stacks**
-    header_pattern = re.compile(
-        r'^(?:'
-        r'(#{1,3})\s+(.+)'                              # Group 1,2: Markdown headers (# Title)
-        r'|'
-        r'(\*\*[^*\n]+\*\*(?:\s+\*\*[^*\n]+\*\*)*)\s*$' # Group 3: One or more bold blocks
-        r')',
-        re.MULTILINE
-    )
-    
-    matches = list(header_pattern.finditer(markdown_text))
+    matches = list(HEADER_PATTERN.finditer(markdown_text))
     sections = []
     
     # 1. Handle text BEFORE the first header (often the Abstract or Title info)
@@ -94,37 +111,88 @@ def extract_sections_from_markdown(markdown_text: str) -> list[dict]:
     return sections
 
 
-def semantic_chunk_text(text: str, filename: str, section_name: str = "Uncategorized") -> list[dict]:
+def _sentence_groups(sentences: list[str], buffer_size: int) -> list[str]:
+    """Each sentence with `buffer_size` neighbours on either side: what is embedded to find breakpoints"""
+    return [
+        "".join(sentences[max(i - buffer_size, 0):i + 1 + buffer_size])
+        for i in range(len(sentences))
+    ]
+
+
+def _semantic_split(text: str) -> list[tuple[str, np.ndarray]]:
+    """
+    Same breakpoint logic as SemanticSplitterNodeParser (using only its public settings),
+    but keeps the sentence-group embeddings it computes: each chunk's vector is the mean of
+    its groups' embeddings, so retrieval doesn't need to embed the chunks a second time.
+    Returns [(chunk_text, embedding), ...].
+    """
+    splitter = get_semantic_splitter()
+    sentences = splitter.sentence_splitter(text)
+    if not sentences:
+        return []
+    embeddings = np.asarray(
+        splitter.embed_model.get_text_embedding_batch(_sentence_groups(sentences, splitter.buffer_size)),
+        dtype=np.float32
+    )
+
+    # Cosine distance between consecutive sentence groups
+    unit = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    distances = 1.0 - (unit[:-1] * unit[1:]).sum(axis=1)
+
+    if len(distances) > 0:
+        threshold = np.percentile(distances, splitter.breakpoint_percentile_threshold)
+        groups = np.split(np.arange(len(sentences)), np.flatnonzero(distances > threshold) + 1)
+    else:
+        # A single sentence: a single chunk
+        groups = [np.arange(len(sentences))]
+
+    # Sentences keep their trailing whitespace, so they are joined as they are
+    return [
+        ("".join(sentences[i] for i in group).strip(), embeddings[group].mean(axis=0))
+        for group in groups
+    ]
+
+
+def semantic_chunk_text(
+    text: str,
+    filename: str,
+    section_name: str = "Uncategorized",
+    doc_id: str | None = None,
+    section_index: int = 0
+) -> list[dict]:
     """
     Split text ensuring metadata is preserved for Graph RAG.
+    `section_index` is the section's position in the document, so repeated sections
+    (same heading and text) still get distinct chunk ids.
+    Each chunk carries its embedding under "embedding" (a numpy array) for the retrieval index.
+    Raises if the text can't be split (e.g. the embedding call failed), so callers can tell
+    a failed section from an empty one.
     """
     if not text or not text.strip():
         return []
 
-    # 1. Inject Metadata HERE so it propagates to the nodes
+    # 1. Inject Metadata HERE so it propagates to the chunks
     # This is crucial for Graph RAG (identifying which paper/section a node belongs to)
     initial_metadata = {
         "filename": filename,
         "section": section_name,
         "category": "scientific_paper"
     }
+    if doc_id:
+        initial_metadata["doc_id"] = doc_id
 
-    try:    
-        document = Document(text=text, metadata=initial_metadata)
-        
-        # 2. Get Nodes
-        nodes = semantic_splitter.get_nodes_from_documents([document])
-        
-        chunks = []
-        for node in nodes:
-            chunks.append({
-                "id": node.id_,
-                "text": node.get_content(),
-                "char_count": len(node.get_content()),
-                "metadata": node.metadata, 
-            })
-        return chunks
-
-    except Exception as e:
-        logger.error(f"Error chunking {filename}: {e}")
-        return []
\ No newline at end of file
+    # 2. Get Chunks
+    chunks = []
+    for i, (chunk_text, embedding) in enumerate(_semantic_split(text)):
+        # Deterministic ids: re-chunking the same text maps onto the same indexed chunks
+        chunk_id = uuid.uuid5(
+            uuid.NAMESPACE_URL, f"{doc_id or filename}|{section_index}|{section_name}|{i}|{chunk_text}"
+        )
+        chunks.append({
+            "id": str(chunk_id),
+            "text": chunk_text,
+            "char_count": len(chunk_text),
+            "metadata": dict(initial_metadata),
+            "embedding": embedding,
+        })
+    return chunks
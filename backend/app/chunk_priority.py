@@ -0,0 +1,61 @@
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Weight of the entity-density signal in a chunk's priority (0 ranks by section alone)
+PRIORITY_DENSITY_WEIGHT = float(os.getenv("PRIORITY_DENSITY_WEIGHT", "0.3"))
+# Share of entity-like tokens at which the density signal saturates
+DENSITY_SATURATION = 0.25
+DEFAULT_SECTION_WEIGHT = 0.5
+
+# First matching pattern wins, so more specific names come before generic ones
+SECTION_WEIGHTS = [
+    (re.compile(r"reference|bibliograph|works cited"), 0.0),
+    (re.compile(r"acknowledg|appendix|supplementa|funding|author contribution|ethic"), 0.1),
+    (re.compile(r"related work|prior work|literature|previous work"), 0.25),
+    (re.compile(r"background|preliminar|notation"), 0.4),
+    # Text before the first header (chunk_builder's fallback name): title, authors and affiliations,
+    # sometimes an unmarked abstract
+    (re.compile(r"abstract_or_preamble"), 0.5),
+    (re.compile(r"abstract"), 1.0),
+    (re.compile(r"method|approach|model|architecture|framework|proposed|algorithm"), 0.9),
+    (re.compile(r"experiment|evaluation|setup|benchmark|implementation"), 0.85),
+    (re.compile(r"result|ablation|analysis|finding|discussion|comparison"), 0.85),
+    (re.compile(r"introduction|conclusion|summary|contribution"), 0.6),
+]
+
+# Acronyms (BERT, WMT), mixed case (ResNet, GPT-4o), tokens with digits (ResNet-50, 92.3%)
+ENTITY_TOKEN = re.compile(r"[A-Z]{2,}\w*|[A-Za-z]+[A-Z][A-Za-z]*|\w*\d[\w.%-]*")
+TOKEN = re.compile(r"\S+")
+
+
+def section_weight(section: str | None) -> float:
+    name = (section or "").lower()
+    for pattern, weight in SECTION_WEIGHTS:
+        if pattern.search(name):
+            return weight
+    return DEFAULT_SECTION_WEIGHT
+
+
+def entity_density(text: str) -> float:
+    """Share of tokens that look like named methods, datasets, metrics or numbers, scaled to [0, 1]"""
+    tokens = TOKEN.findall(text)
+    if not tokens:
+        return 0.0
+    entity_like = sum(1 for token in tokens if ENTITY_TOKEN.fullmatch(token.strip(".,;:()[]\"'")))
+    return min(entity_like / len(tokens) / DENSITY_SATURATION, 1.0)
+
+
+def chunk_priority(chunk: dict) -> float:
+    """
+    Extraction priority in [0, 1]: Abstract, Method, Experiments and Results first, References last,
+    adjusted by how many entity-like tokens the chunk contains
+    """
+    weight = section_weight(chunk.get("metadata", {}).get("section"))
+    # Reference lists are dense in names and years but rarely hold new entities: always last
+    if weight == 0 or PRIORITY_DENSITY_WEIGHT <= 0:
+        return weight
+    density = entity_density(chunk["text"])
+    return round((1 - PRIORITY_DENSITY_WEIGHT) * weight + PRIORITY_DENSITY_WEIGHT * density, 4)
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import threading
+import time
+from functools import lru_cache
+import numpy as np
+from dotenv import load_dotenv
+from loguru import logger
+from .rate_limit import get_http_client
+from .store import get_connection, transaction
+from .vector_index import VectorIndex
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+
+# Entity vectors use shortened text-embedding-3 outputs: plenty for names + descriptions,
+# and small enough that a full scan of the float16 matrix stays in the millisecond range
+ENTITY_EMBED_DIM = int(os.getenv("ENTITY_EMBED_DIM", "256"))
+# Above this many entities, searches go through the IVF coarse quantizer
+IVF_MIN_ENTITIES = int(os.getenv("IVF_MIN_ENTITIES", "20000"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+MERGE_THRESHOLD = float(os.getenv("MERGE_THRESHOLD", "0.9"))
+
+
+@lru_cache(maxsize=1)
+def get_entity_embed_model():
+    from llama_index.embeddings.openai import OpenAIEmbedding
+
+    return OpenAIEmbedding(
+        model="text-embedding-3-large",
+        dimensions=ENTITY_EMBED_DIM,
+        api_key=OPENAI_API_KEY,
+        api_base=OPENAI_BASE_URL,
+        http_client=get_http_client()
+    )
+
+
+@lru_cache(maxsize=1024)
+def _embed_query(text: str) -> tuple[float, ...]:
+    return tuple(get_entity_embed_model().get_text_embedding(text))
+
+
+def entity_text(node: dict) -> str:
+    """Text embedded for an entity: its label plus the description from EntityProperties"""
+    description = (node.get("properties") or {}).get("description") or ""
+    return f"{node['label']}: {description}" if description else node["label"]
+
+
+class EntityIndex:
+    """
+    Entity vectors persisted in the shared database, mirrored in a per-worker VectorIndex.
+    Each worker picks up rows written by other workers on its next query.
+    The index is updated in place, so reads hold the same lock as refreshes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = VectorIndex(ENTITY_EMBED_DIM)
+        self._meta: dict[str, dict] = {}
+        self._loaded_until = 0.0
+        self._trained_size = 0
+
+    def _refresh(self) -> None:
+        with self._lock:
+            rows = get_connection().execute(
+                "SELECT id, label, type, description, vector, updated_at FROM entity_vectors WHERE updated_at > ?",
+                (self._loaded_until,)
+            ).fetchall()
+            if rows:
+                self._index.add(
+                    [r[0] for r in rows],
+                    np.stack([np.frombuffer(r[4], dtype=np.float16) for r in rows])
+                )
+                for entity_id, label, entity_type, description, _, _ in rows:
+                    self._meta[entity_id] = {"label": label, "type": entity_type, "description": description}
+                self._loaded_until = max(r[5] for r in rows)
+
+            # (Re)train the coarse quantizer whenever the index has doubled since the last training
+            size = len(self._index)
+            if size >= IVF_MIN_ENTITIES and size >= 2 * self._trained_size:
+                start = time.perf_counter()
+                self._index.train()
+                self._trained_size = size
+                logger.info(f"Trained entity IVF on {size} vectors in {time.perf_counter() - start:.2f}s")
+
+    def add(self, nodes: list[dict]) -> int:
+        """
+        Embeds and stores entities whose label/description are new or changed.
+        Returns the number of entities embedded.
+        """
+        conn = get_connection()
+        texts = {node["id"]: entity_text(node) for node in nodes}
+        hashes = {entity_id: hashlib.sha256(text.encode()).hexdigest() for entity_id, text in texts.items()}
+        known = {}
+        ids = list(hashes)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            known.update(conn.execute(
+                f"SELECT id, text_hash FROM entity_vectors WHERE id IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall())
+
+        pending = [node for node in nodes if known.get(node["id"]) != hashes[node["id"]]]
+        pending = list({node["id"]: node for node in pending}.values())
+        if not pending:
+            return 0
+
+        vectors = get_entity_embed_model().get_text_embedding_batch([texts[n["id"]] for n in pending])
+        with transaction() as conn:
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO entity_vectors (id, label, type, description, text_hash, vector, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        node["id"],
+                        node["label"],
+                        node["type"],
+                        (node.get("properties") or {}).get("description"),
+                        hashes[node["id"]],
+                        np.asarray(vector, dtype=np.float16).tobytes(),
+                        now,
+                    )
+                    for node, vector in zip(pending, vectors)
+                ]
+            )
+        logger.info(f"Embedded {len(pending)} entities")
+        return len(pending)
+
+    def size(self) -> int:
+        self._refresh()
+        with self._lock:
+            return len(self._index)
+
+    def search(self, query: str, k: int = 10, entity_type: str | None = None) -> list[dict]:
+        """Semantic entity search; over-fetches when filtering by type"""
+        self._refresh()
+        fetch = k * 4 if entity_type else k
+        vector = _embed_query(query)
+        results = []
+        with self._lock:
+            hits = self._index.search([vector], k=fetch, nprobe=IVF_NPROBE)[0]
+            for entity_id, score in hits:
+                meta = self._meta[entity_id]
+                if entity_type and meta["type"] != entity_type:
+                    continue
+                results.append({"id": entity_id, "score": score, **meta})
+        return results[:k]
+
+    def merge_suggestions(
+        self,
+        ids: list[str] | None = None,
+        threshold: float = MERGE_THRESHOLD,
+        k: int = 5
+    ) -> list[dict]:
+        """
+        Pairs of same-type entities whose vectors are at least `threshold` cosine-similar,
+        e.g. "Transformer architecture" / "Transformer model".
+        With `ids`, compares those entities with each other; otherwise searches the whole corpus.
+        """
+        self._refresh()
+        with self._lock:
+            if ids is None:
+                # Whole corpus: approximate neighbours of every entity
+                ids = list(self._index.ids)
+                hits_per_id = self._index.search(self._index.matrix, k=k + 1, nprobe=IVF_NPROBE)
+            else:
+                # One graph: exact pairwise similarities within the given entities
+                ids = [i for i in dict.fromkeys(ids) if i in self._index.positions]
+                vectors = self._index.matrix[[self._index.positions[i] for i in ids]].astype(np.float32)
+                hits_per_id = []
+                for start in range(0, len(ids), 1024):
+                    scores = vectors[start:start + 1024] @ vectors.T
+                    hits_per_id.extend(
+                        [(ids[j], float(row[j])) for j in np.flatnonzero(row >= threshold)]
+                        for row in scores
+                    )
+
+            suggestions = {}
+            for source, hits in zip(ids, hits_per_id):
+                for target, score in hits:
+                    if target == source or score < threshold:
+                        continue
+                    if self._meta[target]["type"] != self._meta[source]["type"]:
+                        continue
+                    pair = tuple(sorted((source, target)))
+                    suggestions[pair] = max(score, suggestions.get(pair, 0.0))
+
+            return sorted(
+                (
+                    {
+                        "source": a,
+                        "target": b,
+                        "source_label": self._meta[a]["label"],
+                        "target_label": self._meta[b]["label"],
+                        "score": score,
+                    }
+                    for (a, b), score in suggestions.items()
+                ),
+                key=lambda s: -s["score"]
+            )
+
+
+entity_index = EntityIndex()
@@ -0,0 +1,61 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# Per-worker pool for blocking calls (PDF conversion, embeddings, LLM calls).
+# Bounded so one worker can't spawn unlimited threads under load.
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="axon-blocking")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Runs a blocking function on the bounded pool without blocking the event loop.
+    The caller's context variables are carried over to the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+
+async def iterate_blocking(iterator):
+    """
+    Async iteration over a blocking iterator: each `next()` runs on the bounded pool.
+    The iterator is closed if the consumer stops early (e.g. the client disconnects), once a
+    `next()` still running on the pool has returned: a running generator can't be closed.
+    """
+    sentinel = object()
+    pending = None
+    try:
+        while True:
+            pending = _executor.submit(contextvars.copy_context().run, next, iterator, sentinel)
+            item = await asyncio.wrap_future(pending)
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        # Cancelling the consumer only stopped the wait; a call that already started runs on
+        if pending is not None and not pending.cancel() and not pending.done():
+            with contextlib.suppress(Exception):
+                await asyncio.wrap_future(pending)
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await run_blocking(close)
+
+
+def shutdown_executor() -> None:
+    """
+    Drains the pool on shutdown: waits for in-flight calls, drops queued ones.
+    """
+    logger.info("Draining blocking pool...")
+    _executor.shutdown(wait=True, cancel_futures=True)
+
@@ -0,0 +1,167 @@
+import numpy as np
+from scipy import sparse
+from .graph_model import CompactGraph
+
+# Label propagation stops when fewer than this fraction of labels change in an iteration
+LPA_TOLERANCE = 1e-3
+LPA_MAX_ITERATIONS = 20
+SELF_WEIGHT = 0.5
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-8
+PAGERANK_MAX_ITERATIONS = 100
+MAX_LEVELS = 3
+TOP_ENTITIES = 5
+
+
+def build_adjacency(graph: CompactGraph) -> sparse.csr_matrix:
+    """
+    Sparse directed adjacency matrix over the graph's nodes, in `present_nodes()` order
+    (parallel edges summed into weights). Edges referencing unknown nodes are ignored.
+    """
+    codes = graph.present_nodes()
+    n = len(codes)
+    row_of = np.full(len(graph.ids), -1, dtype=np.int64)
+    row_of[codes] = np.arange(n)
+    source, target, _ = graph.edge_arrays()
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(source)), (row_of[source], row_of[target])), shape=(n, n)
+    )
+    adjacency.sum_duplicates()
+    return adjacency
+
+
+def pagerank(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """Power-iteration PageRank; dangling nodes spread their rank uniformly"""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inv_out = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    # Column-stochastic transition matrix, transposed so rank flows along edges
+    transition = (sparse.diags(inv_out) @ adjacency).T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        dangling_mass = rank[dangling].sum()
+        updated = PAGERANK_DAMPING * (transition @ rank + dangling_mass / n) + (1 - PAGERANK_DAMPING) / n
+        if np.abs(updated - rank).sum() < PAGERANK_TOLERANCE:
+            return updated
+        rank = updated
+    return rank
+
+
+def _row_argmax(scores: sparse.csr_matrix) -> np.ndarray:
+    """Column of the maximum per row, ties broken by lowest column. Every row must be non-empty."""
+    scores.sort_indices()
+    row_lengths = np.diff(scores.indptr)
+    row_max = np.maximum.reduceat(scores.data, scores.indptr[:-1])
+    is_max = scores.data == np.repeat(row_max, row_lengths)
+    rows = np.repeat(np.arange(scores.shape[0]), row_lengths)[is_max]
+    cols = scores.indices[is_max]
+    # Columns are sorted within each row, so the first maximum per row is the lowest column
+    first = np.r_[True, rows[1:] != rows[:-1]]
+    return cols[first]
+
+
+def label_propagation(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """
+    Community detection by label propagation on the undirected graph.
+    Each node adopts the label with the highest total edge weight among its neighbours.
+    A half-weight self-loop keeps a node's label on ties, which damps oscillation
+    without stopping it from joining its neighbours. Returns compact labels 0..k-1.
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    undirected = (adjacency + adjacency.T + SELF_WEIGHT * sparse.identity(n, format="csr")).tocsr()
+    labels = np.arange(n)
+    rows = np.arange(n)
+
+    for _ in range(LPA_MAX_ITERATIONS):
+        one_hot = sparse.csr_matrix((np.ones(n), (rows, labels)), shape=(n, n))
+        updated = _row_argmax(undirected @ one_hot)
+        changed = np.count_nonzero(updated != labels)
+        labels = updated
+        if changed <= LPA_TOLERANCE * n:
+            break
+
+    _, compact = np.unique(labels, return_inverse=True)
+    return compact
+
+
+def community_hierarchy(adjacency: sparse.csr_matrix) -> list[np.ndarray]:
+    """
+    Repeated label propagation on the graph of communities.
+    Returns one membership array per level: level 0 maps nodes to communities,
+    level i maps level i-1 communities to their parent community.
+    """
+    levels = []
+    current = adjacency
+    for _ in range(MAX_LEVELS):
+        labels = label_propagation(current)
+        levels.append(labels)
+        k = labels.max() + 1 if len(labels) else 0
+        if k <= 1 or k == current.shape[0]:
+            break
+        # Collapse communities into super-nodes: C = P^T A P
+        membership = sparse.csr_matrix(
+            (np.ones(len(labels)), (np.arange(len(labels)), labels)),
+            shape=(len(labels), k)
+        )
+        current = (membership.T @ current @ membership).tocsr()
+        current.setdiag(0)
+        current.eliminate_zeros()
+        if current.nnz == 0:
+            break
+    return levels
+
+
+def analyze_graph(graph: CompactGraph) -> dict:
+    """
+    Degree and PageRank centrality plus a community hierarchy with per-community top entities.
+    Community ids are "L<level>-<index>"; level 0 communities contain entities directly.
+    """
+    codes = graph.present_nodes()
+    node_ids = [graph.ids[code] for code in codes]
+    adjacency = build_adjacency(graph)
+    degree = np.asarray(adjacency.sum(axis=0)).ravel() + np.asarray(adjacency.sum(axis=1)).ravel()
+    rank = pagerank(adjacency)
+    levels = community_hierarchy(adjacency)
+
+    # Membership of every node at every level
+    node_membership = []
+    membership = np.arange(len(codes))
+    for labels in levels:
+        membership = labels[membership]
+        node_membership.append(membership)
+
+    communities = []
+    for level, members in enumerate(node_membership):
+        parents = node_membership[level + 1] if level + 1 < len(node_membership) else None
+        k = members.max() + 1 if len(members) else 0
+        sizes = np.bincount(members, minlength=k)
+        # Rank nodes by PageRank once, then pick the first few per community
+        order = np.lexsort((-rank, members))
+        starts = np.searchsorted(members[order], np.arange(k))
+        for c in range(k):
+            top = order[starts[c]:starts[c] + min(TOP_ENTITIES, sizes[c])]
+            communities.append({
+                "id": f"L{level}-{c}",
+                "level": level,
+                "size": int(sizes[c]),
+                "parent": f"L{level + 1}-{parents[top[0]]}" if parents is not None else None,
+                "label": ", ".join(graph.labels[graph.node_label[codes[i]]] for i in top[:3]),
+                "top_entities": [node_ids[i] for i in top],
+            })
+
+    node_metrics = [
+        {
+            "id": node_ids[i],
+            "community": f"L0-{node_membership[0][i]}" if node_membership else None,
+            "degree": int(degree[i]),
+            "pagerank": float(rank[i]),
+        }
+        for i in range(len(codes))
+    ]
+    return {"nodes": node_metrics, "communities": communities, "levels": len(levels)}
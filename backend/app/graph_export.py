@@ -0,0 +1,239 @@
+import json
+import os
+import re
+from typing import Iterator, get_args
+from xml.sax.saxutils import escape, quoteattr
+from dotenv import load_dotenv
+from .ontology import EntityType, RelationType
+from .store import get_connection
+
+load_dotenv()
+
+# Rows read from the database (and written as one record batch / row group) at a time.
+# Memory use is bounded by this, not by the size of the graph.
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "50000"))
+
+NODE_FIELDS = ["section", "canonical_name", "aliases", "description"]
+EDGE_FIELDS = ["confidence", "context", "section", "quantitative_detail"]
+
+EXPORT_FORMATS = {
+    "jsonl": "application/x-ndjson",
+    "graphml": "application/graphml+xml",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+COLUMNAR_FORMATS = {"parquet", "arrow"}
+
+# Characters XML 1.0 doesn't allow even escaped (control characters, lone surrogates, U+FFFE/U+FFFF),
+# e.g. from PDF text extraction
+XML_INVALID_CHARS = re.compile("[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]")
+
+
+# Batches are fetched with keyset pagination, one short query per batch, so no cursor
+# outlives a batch (each batch may run on a different pool thread and connection)
+
+def iter_node_batches(batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[list[tuple]]:
+    last_id = ""
+    while True:
+        rows = get_connection().execute(
+            "SELECT id, label, type, properties FROM graph_nodes WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_rows)
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def iter_edge_batches(batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[list[tuple]]:
+    last_key = ("", "", "")
+    while True:
+        rows = get_connection().execute(
+            "SELECT source, target, relationship, properties FROM graph_edges "
+            "WHERE (source, target, relationship) > (?, ?, ?) "
+            "ORDER BY source, target, relationship LIMIT ?",
+            (*last_key, batch_rows)
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_key = rows[-1][:3]
+
+
+def _properties(packed: str | None) -> dict:
+    return (json.loads(packed) if packed else None) or {}
+
+
+def export_jsonl() -> Iterator[bytes]:
+    """One JSON object per line: every node ({"type": "node", ...}), then every edge"""
+    for rows in iter_node_batches():
+        yield "".join(
+            json.dumps({"type": "node", "id": r[0], "label": r[1], "entity_type": r[2], "properties": _properties(r[3])}) + "\n"
+            for r in rows
+        ).encode()
+    for rows in iter_edge_batches():
+        yield "".join(
+            json.dumps({"type": "edge", "source": r[0], "target": r[1], "relationship": r[2], "properties": _properties(r[3])}) + "\n"
+            for r in rows
+        ).encode()
+
+
+def _xml_text(value) -> str:
+    return XML_INVALID_CHARS.sub("", str(value))
+
+
+def _graphml_data(key: str, value) -> str:
+    if value is None or value == []:
+        return ""
+    if isinstance(value, list):
+        value = json.dumps(value)
+    return f'<data key="{key}">{escape(_xml_text(value))}</data>'
+
+
+def export_graphml() -> Iterator[bytes]:
+    """GraphML (directed), with node/edge properties as data attributes"""
+    keys = [("n_label", "node", "label"), ("n_type", "node", "type")]
+    keys += [(f"n_{field}", "node", field) for field in NODE_FIELDS]
+    keys += [("e_relationship", "edge", "relationship")]
+    keys += [(f"e_{field}", "edge", field) for field in EDGE_FIELDS]
+    header = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">',
+    ]
+    header += [
+        f'<key id="{key_id}" for="{domain}" attr.name="{name}" attr.type="string"/>'
+        for key_id, domain, name in keys
+    ]
+    header.append('<graph id="axon" edgedefault="directed">')
+    yield ("\n".join(header) + "\n").encode()
+
+    for rows in iter_node_batches():
+        lines = []
+        for node_id, label, node_type, packed in rows:
+            properties = _properties(packed)
+            data = _graphml_data("n_label", label) + _graphml_data("n_type", node_type)
+            data += "".join(_graphml_data(f"n_{field}", properties.get(field)) for field in NODE_FIELDS)
+            lines.append(f"<node id={quoteattr(_xml_text(node_id))}>{data}</node>\n")
+        yield "".join(lines).encode()
+
+    for rows in iter_edge_batches():
+        lines = []
+        for source, target, relationship, packed in rows:
+            properties = _properties(packed)
+            data = _graphml_data("e_relationship", relationship)
+            data += "".join(_graphml_data(f"e_{field}", properties.get(field)) for field in EDGE_FIELDS)
+            lines.append(f"<edge source={quoteattr(_xml_text(source))} target={quoteattr(_xml_text(target))}>{data}</edge>\n")
+        yield "".join(lines).encode()
+
+    yield b"</graph>\n</graphml>\n"
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are handed out (and released) after each batch"""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _columnar_table(table: str):
+    """(schema, row batches, rows -> record batch) for the nodes or edges table"""
+    import pyarrow as pa
+
+    # type and relationship are dictionary-encoded against a fixed set of values (the ontology's,
+    # plus any others already stored), so every record batch shares one dictionary
+    conn = get_connection()
+    if table == "nodes":
+        stored = [r[0] for r in conn.execute("SELECT DISTINCT type FROM graph_nodes")]
+        dictionary = list(dict.fromkeys([*get_args(EntityType), *stored]))
+        fields = [
+            pa.field("id", pa.string(), nullable=False),
+            pa.field("label", pa.string()),
+            pa.field("type", pa.dictionary(pa.int16(), pa.string())),
+            pa.field("section", pa.string()),
+            pa.field("canonical_name", pa.string()),
+            pa.field("aliases", pa.list_(pa.string())),
+            pa.field("description", pa.string()),
+        ]
+        batches = iter_node_batches()
+    elif table == "edges":
+        stored = [r[0] for r in conn.execute("SELECT DISTINCT relationship FROM graph_edges")]
+        dictionary = list(dict.fromkeys([*get_args(RelationType), *stored]))
+        fields = [
+            pa.field("source", pa.string(), nullable=False),
+            pa.field("target", pa.string(), nullable=False),
+            pa.field("relationship", pa.dictionary(pa.int16(), pa.string())),
+            pa.field("confidence", pa.string()),
+            pa.field("context", pa.string()),
+            pa.field("section", pa.string()),
+            pa.field("quantitative_detail", pa.string()),
+        ]
+        batches = iter_edge_batches()
+    else:
+        raise ValueError(f"Unknown table: {table}")
+
+    property_fields = NODE_FIELDS if table == "nodes" else EDGE_FIELDS
+    codes = {value: code for code, value in enumerate(dictionary)}
+    dictionary = pa.array(dictionary, type=pa.string())
+    schema = pa.schema(fields)
+
+    def to_batch(rows: list[tuple]):
+        properties = [_properties(r[3]) for r in rows]
+        key_columns = [pa.array([r[0] for r in rows], pa.string()), pa.array([r[1] for r in rows], pa.string())]
+        encoded = pa.DictionaryArray.from_arrays(
+            pa.array([codes[r[2]] for r in rows], pa.int16()), dictionary
+        )
+        property_columns = [
+            pa.array([p.get(field) for p in properties], schema.field(field).type)
+            for field in property_fields
+        ]
+        return pa.record_batch(key_columns + [encoded] + property_columns, schema=schema)
+
+    return schema, batches, to_batch
+
+
+def export_columnar(table: str, file_format: str) -> Iterator[bytes]:
+    """
+    Streams the nodes or edges table as Parquet (one row group per batch) or as an
+    Arrow IPC stream. The type/relationship column is dictionary-encoded.
+    Sets up the writer eagerly (so a missing pyarrow fails here); returns the byte chunks.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema, batches, to_batch = _columnar_table(table)
+    sink = _ChunkSink()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    def chunks() -> Iterator[bytes]:
+        for rows in batches:
+            writer.write_batch(to_batch(rows))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return chunks()
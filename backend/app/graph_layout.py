@@ -0,0 +1,219 @@
+import numpy as np
+from .graph_model import CompactGraph
+
+# Coordinates are returned in [-LAYOUT_SCALE, LAYOUT_SCALE] (vis.js canvas units)
+LAYOUT_SCALE = 1000.0
+# Dense spectral initialisation is O(n^3); above this size start from a random layout
+SPECTRAL_INIT_MAX_NODES = 500
+
+# Upper bound for max_nodes: the layout's repulsion step uses dense n x n matrices
+MAX_LAYOUT_NODES = 1000
+
+AGGREGATE_PREFIX = "group:"
+# With too many groups for their aggregates to fit the budget, the smallest share this one
+OTHER_GROUP = "Other"
+
+
+def build_lod_graph(
+    graph: CompactGraph,
+    max_nodes: int = 300,
+    expand: list[str] | None = None,
+    groups: dict[str, str] | None = None
+) -> tuple[list[dict], list[dict], list[str]]:
+    """
+    Level-of-detail view of a graph.
+    When the graph has more than `max_nodes` nodes, the highest-degree nodes stay visible
+    and the rest are collapsed into one aggregate node per group - the entity type,
+    or the group given for the node in `groups` (e.g. its community).
+    Entities of groups listed in `expand` are shown first. Visible entities and aggregates
+    together stay within `max_nodes`.
+    Returns (visible_nodes, visible_edges, collapsed_groups).
+    """
+    expand = set(expand or [])
+    groups = groups or {}
+    codes = graph.present_nodes()
+    n = len(codes)
+    row_of = np.full(len(graph.ids), -1, dtype=np.int64)
+    row_of[codes] = np.arange(n)
+    group_of = [groups.get(graph.ids[code], graph.node_type_name(code)) for code in codes]
+
+    # Degree over edges whose endpoints both exist
+    source, target, relationship = graph.edge_arrays(valid_only=False)
+    src, dst = row_of[source], row_of[target]
+    edge_ids = np.flatnonzero((src >= 0) & (dst >= 0))
+    src, dst, relationship = src[edge_ids], dst[edge_ids], relationship[edge_ids]
+    degree = np.bincount(np.concatenate([src, dst]), minlength=n)
+
+    keep = np.ones(n, dtype=bool)
+    if n > max_nodes:
+        keep[:] = False
+        keys = np.array(group_of)
+
+        def keep_top(candidates: np.ndarray, budget: int) -> None:
+            order = candidates[np.argsort(-degree[candidates], kind="stable")]
+            keep[order[:budget]] = True
+
+        # Aggregates take one slot each; beyond a quarter of the budget, the smallest groups are merged
+        names, sizes = np.unique(keys, return_counts=True)
+        max_groups = max(max_nodes // 4, 1)
+        if len(names) > max_groups:
+            by_size = names[np.argsort(-sizes, kind="stable")].tolist()
+            named = ([g for g in by_size if g in expand] + [g for g in by_size if g not in expand])[:max_groups - 1]
+            keys = np.where(np.isin(keys, named), keys, OTHER_GROUP)
+            group_of = keys.tolist()
+        budget = max(max_nodes - len(set(group_of)), 0)
+
+        # Expanded groups' entities first, then the rest, all from one budget
+        expanded = np.isin(keys, list(expand))
+        keep_top(np.flatnonzero(expanded), budget)
+        keep_top(np.flatnonzero(~expanded), budget - int(keep.sum()))
+
+    # Map every node to what it is drawn as: itself, or its group's aggregate
+    kept = np.flatnonzero(keep)
+    drawn_as = np.empty(n, dtype=np.int64)
+    drawn_as[kept] = np.arange(len(kept))
+    visible_nodes = [{**graph.node_dict(int(codes[row])), "aggregate": False, "count": 1} for row in kept]
+    group_types: dict[str, list[str]] = {}
+    aggregate_of: dict[str, int] = {}
+    for row in np.flatnonzero(~keep):
+        group = group_of[row]
+        if group not in aggregate_of:
+            aggregate_of[group] = len(kept) + len(aggregate_of)
+            group_types[group] = []
+        drawn_as[row] = aggregate_of[group]
+        group_types[group].append(graph.node_type_name(codes[row]))
+
+    for group, member_types in group_types.items():
+        count = len(member_types)
+        # Aggregates take the most common type among their members (for colouring)
+        dominant_type = max(set(member_types), key=member_types.count)
+        visible_nodes.append({
+            "id": f"{AGGREGATE_PREFIX}{group}",
+            "label": f"{group} ({count})",
+            "type": dominant_type,
+            "properties": {"description": f"{count} collapsed entities"},
+            "aggregate": True,
+            "count": count,
+        })
+
+    # Edges between visible entities are kept as they are (the graph has no duplicates)
+    vs, vt = drawn_as[src], drawn_as[dst]
+    direct = (vs < len(kept)) & (vt < len(kept))
+    visible_edges = [{**graph.edge_dict(int(i)), "count": 1} for i in edge_ids[direct]]
+
+    # Edges touching an aggregate are re-routed and merged per (source, target) pair
+    rerouted = ~direct & (vs != vt)
+    if rerouted.any():
+        pair_keys = vs[rerouted] * len(visible_nodes) + vt[rerouted]
+        rerouted_relationship = relationship[rerouted]
+        _, first, inverse, counts = np.unique(pair_keys, return_index=True, return_inverse=True, return_counts=True)
+        lowest = np.full(len(first), np.iinfo(np.int64).max)
+        highest = np.full(len(first), -1)
+        np.minimum.at(lowest, inverse, rerouted_relationship)
+        np.maximum.at(highest, inverse, rerouted_relationship)
+        rerouted_ids = edge_ids[rerouted]
+        rerouted_vs, rerouted_vt = vs[rerouted], vt[rerouted]
+        for pair, position in enumerate(first):
+            edge = graph.edge_dict(int(rerouted_ids[position]))
+            edge["source"] = visible_nodes[rerouted_vs[position]]["id"]
+            edge["target"] = visible_nodes[rerouted_vt[position]]["id"]
+            edge["count"] = int(counts[pair])
+            if lowest[pair] != highest[pair]:
+                edge["relationship"] = "MIXED"
+            visible_edges.append(edge)
+
+    return visible_nodes, visible_edges, sorted(group_types)
+
+
+def _spectral_positions(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Initial positions from the 2nd and 3rd eigenvectors of the graph Laplacian"""
+    adjacency = np.zeros((n, n))
+    adjacency[src, dst] = 1.0
+    adjacency[dst, src] = 1.0
+    laplacian = np.diag(adjacency.sum(axis=1)) - adjacency
+    _, vectors = np.linalg.eigh(laplacian)
+    return vectors[:, 1:3].copy()
+
+
+def force_layout(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    iterations: int = 60,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Vectorized Fruchterman-Reingold layout.
+    `src`/`dst` are edge endpoint indices. Returns an (n, 2) array of coordinates.
+    """
+    if n == 0:
+        return np.zeros((0, 2))
+    if n == 1:
+        return np.zeros((1, 2))
+
+    rng = np.random.default_rng(seed)
+    if n <= SPECTRAL_INIT_MAX_NODES and len(src):
+        pos = _spectral_positions(n, src, dst)
+        pos += rng.normal(scale=1e-3, size=pos.shape)  # break ties between isolated nodes
+    else:
+        pos = rng.uniform(-1.0, 1.0, size=(n, 2))
+    pos -= pos.mean(axis=0)
+    pos /= np.abs(pos).max() or 1.0
+
+    k = np.sqrt(4.0 / n)  # ideal edge length for a 2x2 box
+    temperature = 0.2
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        # Repulsion between all pairs: k^2 / d along the separation vector.
+        # With w_ij = k^2 / d_ij^2, sum_j w_ij (p_i - p_j) = p_i * sum_j w_ij - (W @ p)_i
+        sq_norms = (pos ** 2).sum(axis=1)
+        dist_sq = sq_norms[:, None] + sq_norms[None, :] - 2.0 * (pos @ pos.T)
+        weights = k * k / np.maximum(dist_sq, 1e-6)
+        np.fill_diagonal(weights, 0.0)
+        displacement = pos * weights.sum(axis=1)[:, None] - weights @ pos
+
+        # Attraction along edges: d^2 / k
+        if len(src):
+            edge_delta = pos[src] - pos[dst]
+            edge_dist = np.maximum(np.sqrt((edge_delta ** 2).sum(axis=1)), 1e-3)
+            pull = edge_delta * (edge_dist / k)[:, None]
+            np.subtract.at(displacement, src, pull)
+            np.add.at(displacement, dst, pull)
+
+        # Move by at most the current temperature
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        pos += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature -= cooling
+
+    pos -= pos.mean(axis=0)
+    pos /= np.abs(pos).max() or 1.0
+    return pos
+
+
+def layout_graph(
+    graph: CompactGraph,
+    max_nodes: int = 300,
+    expand: list[str] | None = None,
+    groups: dict[str, str] | None = None
+) -> dict:
+    """
+    Collapses the graph to at most ~max_nodes visible nodes and computes their coordinates,
+    so the client can render with physics disabled.
+    """
+    visible_nodes, visible_edges, collapsed = build_lod_graph(graph, max_nodes, expand, groups)
+
+    index = {node["id"]: i for i, node in enumerate(visible_nodes)}
+    src = np.array([index[e["source"]] for e in visible_edges], dtype=np.int64)
+    dst = np.array([index[e["target"]] for e in visible_edges], dtype=np.int64)
+    pos = force_layout(len(visible_nodes), src, dst) * LAYOUT_SCALE
+
+    for node, (x, y) in zip(visible_nodes, pos):
+        node["x"] = float(x)
+        node["y"] = float(y)
+
+    return {
+        "nodes": visible_nodes,
+        "edges": visible_edges,
+        "collapsed_groups": collapsed,
+    }
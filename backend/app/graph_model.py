@@ -0,0 +1,231 @@
+import json
+from array import array
+from typing import Iterable, Iterator
+import numpy as np
+
+MISSING = -1
+# Edge keys pack (source, target, relationship) codes into one int: 28 + 28 + 16 bits
+_NODE_BITS = 28
+_RELATIONSHIP_BITS = 16
+
+
+class StringPool:
+    """Interns strings as dense integer codes (0, 1, 2, ...)"""
+
+    __slots__ = ("codes", "strings")
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+        self.strings: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def __getitem__(self, code: int) -> str:
+        return self.strings[code]
+
+    def get(self, string: str) -> int | None:
+        return self.codes.get(string)
+
+    def code(self, string: str) -> int:
+        code = self.codes.get(string)
+        if code is None:
+            code = self.codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+
+def _pack_properties(properties: dict | None) -> str | None:
+    return json.dumps(properties, separators=(",", ":")) if properties else None
+
+
+def _unpack_properties(packed: str | None) -> dict | None:
+    return json.loads(packed) if packed else None
+
+
+class CompactGraph:
+    """
+    Merged knowledge graph in columnar form.
+    Node ids, labels, types and relationships are interned; node `i` is the i-th id of `ids`
+    and its columns hold label/type codes and compact JSON properties. Edges are integer
+    columns of source, target, relationship and properties codes (edge properties repeat
+    a lot, so their JSON is interned too). Ids referenced only by edges have MISSING
+    label/type until the node itself is added.
+    First occurrence wins for nodes and for (source, target, relationship) edges.
+    """
+
+    __slots__ = (
+        "ids", "labels", "types", "relationships",
+        "node_label", "node_type", "node_properties",
+        "edge_source", "edge_target", "edge_relationship", "edge_properties", "edge_property_sets",
+        "_edge_keys",
+    )
+
+    def __init__(self):
+        self.ids = StringPool()
+        self.labels = StringPool()
+        self.types = StringPool()
+        self.relationships = StringPool()
+        self.node_label = array("i")
+        self.node_type = array("h")
+        self.node_properties: list[str | None] = []
+        self.edge_source = array("I")
+        self.edge_target = array("I")
+        self.edge_relationship = array("H")
+        self.edge_properties = array("i")
+        self.edge_property_sets = StringPool()
+        self._edge_keys: set[int] = set()
+
+    @classmethod
+    def from_dicts(cls, nodes: Iterable[dict], edges: Iterable[dict]) -> "CompactGraph":
+        graph = cls()
+        for node in nodes:
+            graph.add_node(node["id"], node["label"], node["type"], node.get("properties"))
+        for edge in edges:
+            graph.add_edge(edge["source"], edge["target"], edge["relationship"], edge.get("properties"))
+        return graph
+
+    @classmethod
+    def from_extraction(cls, extraction) -> "CompactGraph":
+        """From a KnowledgeGraphExtraction (or any object with Entity nodes / Relation edges)"""
+        graph = cls()
+        for entity in extraction.nodes:
+            graph.add_entity(entity)
+        for relation in extraction.edges:
+            graph.add_relation(relation)
+        return graph
+
+    @property
+    def node_count(self) -> int:
+        return len(self.present_nodes())
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_source)
+
+    def has_node(self, node_id: str) -> bool:
+        code = self.ids.get(node_id)
+        return code is not None and self.node_label[code] != MISSING
+
+    def _node_code(self, node_id: str) -> int:
+        code = self.ids.code(node_id)
+        if code == len(self.node_label):
+            if code >= 1 << _NODE_BITS:
+                raise OverflowError("CompactGraph supports at most 2^28 node ids")
+            self.node_label.append(MISSING)
+            self.node_type.append(MISSING)
+            self.node_properties.append(None)
+        return code
+
+    def add_node(self, node_id: str, label: str, node_type: str, properties: dict | None = None) -> int:
+        code = self._node_code(node_id)
+        if self.node_label[code] == MISSING:
+            self.node_label[code] = self.labels.code(label)
+            self.node_type[code] = self.types.code(node_type)
+            self.node_properties[code] = _pack_properties(properties)
+        return code
+
+    def _add_edge_codes(self, source: int, target: int, relationship: int, packed_properties: str | None) -> bool:
+        key = (((source << _NODE_BITS) | target) << _RELATIONSHIP_BITS) | relationship
+        if key in self._edge_keys:
+            return False
+        self._edge_keys.add(key)
+        self.edge_source.append(source)
+        self.edge_target.append(target)
+        self.edge_relationship.append(relationship)
+        self.edge_properties.append(
+            self.edge_property_sets.code(packed_properties) if packed_properties is not None else MISSING
+        )
+        return True
+
+    def add_edge(self, source: str, target: str, relationship: str, properties: dict | None = None) -> bool:
+        """Adds an edge unless an identical (source, target, relationship) one exists; returns whether it was added"""
+        return self._add_edge_codes(
+            self._node_code(source),
+            self._node_code(target),
+            self.relationships.code(relationship),
+            _pack_properties(properties)
+        )
+
+    def add_entity(self, entity) -> int:
+        return self.add_node(
+            entity.id, entity.label, entity.type,
+            entity.properties.model_dump() if entity.properties else None
+        )
+
+    def add_relation(self, relation) -> bool:
+        return self.add_edge(
+            relation.source, relation.target, relation.relationship,
+            relation.properties.model_dump() if relation.properties else None
+        )
+
+    def merge(self, other: "CompactGraph") -> None:
+        """Adds another graph's nodes and edges (first occurrence wins)"""
+        # Properties are copied in their packed form
+        node_codes = [self._node_code(node_id) for node_id in other.ids.strings]
+        for code in other.present_nodes():
+            target = node_codes[code]
+            if self.node_label[target] == MISSING:
+                self.node_label[target] = self.labels.code(other.labels[other.node_label[code]])
+                self.node_type[target] = self.types.code(other.types[other.node_type[code]])
+                self.node_properties[target] = other.node_properties[code]
+        relationship_codes = [self.relationships.code(r) for r in other.relationships.strings]
+        for i in range(other.edge_count):
+            self._add_edge_codes(
+                node_codes[other.edge_source[i]],
+                node_codes[other.edge_target[i]],
+                relationship_codes[other.edge_relationship[i]],
+                other.packed_edge_properties(i)
+            )
+
+    def present_nodes(self) -> np.ndarray:
+        """Codes of the nodes that were added (not just referenced by edges)"""
+        return np.flatnonzero(np.frombuffer(self.node_label, dtype=np.int32) != MISSING)
+
+    def edge_arrays(self, valid_only: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (source, target, relationship) code arrays, copied from the columns
+        (a live view would pin the arrays' buffers and block further appends).
+        With `valid_only`, edges whose endpoints were never added as nodes are dropped.
+        """
+        source = np.array(self.edge_source, dtype=np.int64)
+        target = np.array(self.edge_target, dtype=np.int64)
+        relationship = np.array(self.edge_relationship, dtype=np.int64)
+        if valid_only and len(source):
+            present = np.frombuffer(self.node_label, dtype=np.int32) != MISSING
+            valid = present[source] & present[target]
+            if not valid.all():
+                return source[valid], target[valid], relationship[valid]
+        return source, target, relationship
+
+    def packed_edge_properties(self, i: int) -> str | None:
+        """Edge properties as compact JSON (None when empty)"""
+        code = self.edge_properties[i]
+        return self.edge_property_sets[code] if code != MISSING else None
+
+    def node_type_name(self, code: int) -> str:
+        return self.types[self.node_type[code]]
+
+    def node_dict(self, code: int) -> dict:
+        return {
+            "id": self.ids[code],
+            "label": self.labels[self.node_label[code]],
+            "type": self.types[self.node_type[code]],
+            "properties": _unpack_properties(self.node_properties[code]),
+        }
+
+    def edge_dict(self, i: int) -> dict:
+        return {
+            "source": self.ids[self.edge_source[i]],
+            "target": self.ids[self.edge_target[i]],
+            "relationship": self.relationships[self.edge_relationship[i]],
+            "properties": _unpack_properties(self.packed_edge_properties(i)),
+        }
+
+    def node_dicts(self) -> Iterator[dict]:
+        for code in self.present_nodes():
+            yield self.node_dict(int(code))
+
+    def edge_dicts(self) -> Iterator[dict]:
+        for i in range(self.edge_count):
+            yield self.edge_dict(i)
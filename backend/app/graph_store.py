@@ -0,0 +1,145 @@
+import json
+from .graph_model import CompactGraph
+from .store import get_connection, transaction
+
+# SQLite caps the number of bound parameters per statement
+_BATCH = 500
+
+
+def _in_batches(query: str, ids: list[str]) -> list[tuple]:
+    """Runs `query` (containing one `{}` placeholder list) over ids in batches"""
+    conn = get_connection()
+    rows = []
+    for start in range(0, len(ids), _BATCH):
+        batch = ids[start:start + _BATCH]
+        rows.extend(conn.execute(query.format(",".join("?" * len(batch))), batch).fetchall())
+    return rows
+
+
+def save_chunk_graph(chunk_id: str | None, graph: CompactGraph) -> None:
+    """
+    Merges one chunk's extraction into the stored graph.
+    First occurrence wins for nodes and (source, target, relationship) edges, like the UI merge.
+    """
+    codes = graph.present_nodes()
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO graph_nodes (id, label, type, properties) VALUES (?, ?, ?, ?)",
+            [
+                (
+                    graph.ids[code],
+                    graph.labels[graph.node_label[code]],
+                    graph.node_type_name(code),
+                    graph.node_properties[code],
+                )
+                for code in codes
+            ]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO graph_edges (source, target, relationship, properties) VALUES (?, ?, ?, ?)",
+            [
+                (
+                    graph.ids[graph.edge_source[i]],
+                    graph.ids[graph.edge_target[i]],
+                    graph.relationships[graph.edge_relationship[i]],
+                    graph.packed_edge_properties(i),
+                )
+                for i in range(graph.edge_count)
+            ]
+        )
+        if chunk_id:
+            # Every id the chunk mentions, including edge endpoints defined by other chunks
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunk_entities (chunk_id, entity_id) VALUES (?, ?)",
+                [(chunk_id, entity_id) for entity_id in graph.ids.strings]
+            )
+
+
+def load_graph(entity_ids: list[str], limit: int = 200) -> CompactGraph:
+    """
+    The given entities plus their 1-hop neighbourhood: up to `limit` edges touching them
+    and the nodes at the other end
+    """
+    conn = get_connection()
+    graph = CompactGraph()
+    for start in range(0, len(entity_ids), _BATCH):
+        batch = entity_ids[start:start + _BATCH]
+        placeholders = ",".join("?" * len(batch))
+        for source, target, relationship, properties in conn.execute(
+            f"SELECT source, target, relationship, properties FROM graph_edges WHERE source IN ({placeholders}) "
+            f"UNION SELECT source, target, relationship, properties FROM graph_edges WHERE target IN ({placeholders})",
+            batch + batch
+        ):
+            if graph.edge_count >= limit:
+                break
+            graph.add_edge(source, target, relationship, json.loads(properties) if properties else None)
+
+    node_ids = list(dict.fromkeys(entity_ids + graph.ids.strings))
+    for node_id, label, node_type, properties in _in_batches(
+        "SELECT id, label, type, properties FROM graph_nodes WHERE id IN ({})", node_ids
+    ):
+        graph.add_node(node_id, label, node_type, json.loads(properties) if properties else None)
+    return graph
+
+
+def entities_for_chunks(chunk_ids: list[str]) -> dict[str, list[str]]:
+    mapping: dict[str, list[str]] = {}
+    for chunk_id, entity_id in _in_batches(
+        "SELECT chunk_id, entity_id FROM chunk_entities WHERE chunk_id IN ({})", chunk_ids
+    ):
+        mapping.setdefault(chunk_id, []).append(entity_id)
+    return mapping
+
+
+def chunks_for_entities(entity_ids: list[str]) -> dict[str, list[str]]:
+    mapping: dict[str, list[str]] = {}
+    for chunk_id, entity_id in _in_batches(
+        "SELECT chunk_id, entity_id FROM chunk_entities WHERE entity_id IN ({})", entity_ids
+    ):
+        mapping.setdefault(chunk_id, []).append(entity_id)
+    return mapping
+
+
+# Entities extracted from a document's chunks, by the number of chunks mentioning them
+_DOCUMENT_ENTITIES = """
+    SELECT ce.entity_id, COUNT(*) AS mentions FROM chunk_entities ce JOIN chunks c ON c.id = ce.chunk_id
+    WHERE c.doc_id = ? GROUP BY ce.entity_id
+"""
+
+
+def document_graph(doc_id: str, max_nodes: int = 300) -> CompactGraph:
+    """
+    A bounded view of one document's part of the stored graph: its `max_nodes` most mentioned
+    entities and the edges among them. For documents too large to hold their whole graph.
+    """
+    conn = get_connection()
+    entity_ids = [row[0] for row in conn.execute(
+        f"SELECT entity_id FROM ({_DOCUMENT_ENTITIES}) ORDER BY mentions DESC, entity_id LIMIT ?",
+        (doc_id, max_nodes)
+    )]
+    selected = set(entity_ids)
+    graph = CompactGraph()
+    for node_id, label, node_type, properties in _in_batches(
+        "SELECT id, label, type, properties FROM graph_nodes WHERE id IN ({})", entity_ids
+    ):
+        graph.add_node(node_id, label, node_type, json.loads(properties) if properties else None)
+    for source, target, relationship, properties in _in_batches(
+        "SELECT source, target, relationship, properties FROM graph_edges WHERE source IN ({})", entity_ids
+    ):
+        if target in selected:
+            graph.add_edge(source, target, relationship, json.loads(properties) if properties else None)
+    return graph
+
+
+def document_graph_size(doc_id: str) -> tuple[int, int]:
+    """(entities, edges between them) stored for one document"""
+    conn = get_connection()
+    return conn.execute(
+        f"""
+        WITH doc AS ({_DOCUMENT_ENTITIES})
+        SELECT (SELECT COUNT(*) FROM doc),
+               (SELECT COUNT(*) FROM graph_edges
+                WHERE source IN (SELECT entity_id FROM doc) AND target IN (SELECT entity_id FROM doc))
+        """,
+        (doc_id,)
+    ).fetchone()
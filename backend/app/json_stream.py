@@ -0,0 +1,60 @@
+import json
+
+
+class ArrayItemStreamParser:
+    """
+    Incremental parser for documents shaped like {"key": [{...}, {...}], "other": [...]}.
+    Text is fed as it streams in; `feed` returns (key, item) for every array element
+    whose closing brace arrived, so callers can act on items before the document ends.
+    Each character is scanned once, and only the text of the current item is retained.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.complete = False
+        self._in_string = False
+        self._escape = False
+        self._key_chars: list[str] | None = None
+        self._last_key: str | None = None
+        self._array_key: str | None = None
+        self._item: list[str] | None = None
+
+    def feed(self, text: str) -> list[tuple[str, object]]:
+        items = []
+        for char in text:
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                if char == '"' and not self._escape:
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        self._last_key = json.loads('"' + "".join(self._key_chars) + '"')
+                        self._key_chars = None
+                    continue
+                self._escape = char == "\\" and not self._escape
+                if self._key_chars is not None:
+                    self._key_chars.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                # Strings directly inside the top-level object are its keys
+                if self.depth == 1 and self._array_key is None:
+                    self._key_chars = []
+            elif char in "{[":
+                if self.depth == 1 and char == "[":
+                    self._array_key = self._last_key
+                elif self.depth == 2 and char == "{" and self._array_key is not None:
+                    self._item = [char]
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 2 and char == "}" and self._item is not None:
+                    items.append((self._array_key, json.loads("".join(self._item))))
+                    self._item = None
+                elif self.depth == 1 and char == "]":
+                    self._array_key = None
+                elif self.depth == 0:
+                    self.complete = True
+        return items
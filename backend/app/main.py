@@ -1,26 +1,65 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from fastapi import UploadFile, File, HTTPException
+from pydantic import BaseModel, Field
+from fastapi import UploadFile, File, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
+import asyncio
+import hashlib
+import json
+import math
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-import fitz
-import pymupdf4llm
 from loguru import logger
 from typing import List, Optional
 from .chunk_builder import (
     semantic_chunk_text,
     extract_sections_from_markdown,
 )
-from .ontology import extract_graph_from_chunk
+from .ontology import extract_graph_from_chunk, stream_graph_from_chunk, Entity
+from .resilience import UpstreamError, CircuitOpenError, DeadlineExceeded, QuotaExhausted
+from .uploads import (
+    spool_upload,
+    check_content_length,
+    check_page_count,
+    PIPELINE_MAX_PAGES,
+    PIPELINE_MAX_UPLOAD_MB,
+    MAX_UPLOAD_MB,
+)
+from .warmup import readiness, run_warmup, stop_warmup
+from .executor import run_blocking, iterate_blocking, shutdown_executor
+from .store import document_store, chunk_cache
+from .graph_layout import layout_graph, MAX_LAYOUT_NODES
+from .graph_analysis import analyze_graph
+from .entity_index import entity_index, MERGE_THRESHOLD
+from .graph_store import save_chunk_graph, document_graph
+from .graph_model import CompactGraph
+from .graph_export import EXPORT_FORMATS, COLUMNAR_FORMATS, export_columnar, export_graphml, export_jsonl
+from .retrieval import index_chunks, query_corpus
+from .chunk_priority import chunk_priority
+from .rate_limit import current_tenant, llm_limiter, embedding_limiter
+from .admission import ADMISSION_LIMITERS, AdmissionMiddleware
+from .pdf_text import PARSE_MODE, PARSER_VERSION, convert_pdf_fast
+from .pipeline import PagePipeline
 
 load_dotenv()
 APP_MODE = os.getenv("APP_MODE","DEV")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so liveness probes answer while heavy imports load
+    warmup_task = asyncio.create_task(asyncio.to_thread(run_warmup))
+    yield
+    stop_warmup.set()
+    warmup_task.cancel()
+    # Graceful drain: let in-flight conversions and LLM calls finish before the worker exits
+    shutdown_executor()
+
 app = FastAPI(
     title="Axon API",
     description="Backend API for Axon application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 map_app_mode = {
@@ -28,6 +67,9 @@ map_app_mode = {
     "PROD": "https://axon-agent.online"
 }
 
+# Per-endpoint concurrency limits and bounded queues: excess requests get 429/503 with Retry-After
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[map_app_mode[APP_MODE]],
@@ -36,9 +78,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads from the Content-Length header, before the body is read
+    if request.method == "POST" and request.url.path in ("/parse-pdf", "/process-pdf"):
+        limit_mb = PIPELINE_MAX_UPLOAD_MB if request.url.path == "/process-pdf" else MAX_UPLOAD_MB
+        try:
+            check_content_length(request.headers.get("content-length"), limit_mb)
+        except HTTPException as e:
+            return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+    return await call_next(request)
+
 class HealthResponse(BaseModel):
     status: str
     message: str
+    queues: Optional[dict] = None
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    steps: dict
 
 class NodeResponse(BaseModel):
     id: str
@@ -58,6 +116,7 @@ class GraphResponse(BaseModel):
 
 # Step 1: Parse PDF Response
 class ParsePDFResponse(BaseModel):
+    doc_id: str
     markdown: str
     sections: List[dict]
     section_count: int
@@ -66,6 +125,7 @@ class ParsePDFResponse(BaseModel):
 class ChunkSectionsRequest(BaseModel):
     sections: List[dict]
     filename: str
+    doc_id: Optional[str] = None
 
 class ChunkResponse(BaseModel):
     chunks: List[dict]
@@ -79,24 +139,180 @@ class ExtractChunkResponse(BaseModel):
     nodes: List[NodeResponse]
     edges: List[EdgeResponse]
 
+# Graph layout (server-side coordinates + level of detail)
+class GraphLayoutRequest(BaseModel):
+    nodes: List[NodeResponse]
+    edges: List[EdgeResponse]
+    max_nodes: int = Field(300, ge=1, le=MAX_LAYOUT_NODES)
+    expand: List[str] = []
+    # Optional node id -> group key used for collapsing (defaults to the entity type)
+    groups: Optional[dict[str, str]] = None
+
+class LayoutNode(NodeResponse):
+    x: float
+    y: float
+    aggregate: bool = False
+    count: int = 1
+
+class LayoutEdge(EdgeResponse):
+    count: int = 1
+
+class GraphLayoutResponse(BaseModel):
+    nodes: List[LayoutNode]
+    edges: List[LayoutEdge]
+    collapsed_groups: List[str]
+
+# Graph analysis (centrality + community hierarchy)
+class GraphRequest(BaseModel):
+    nodes: List[NodeResponse]
+    edges: List[EdgeResponse]
+
+class NodeMetrics(BaseModel):
+    id: str
+    community: Optional[str] = None
+    degree: int
+    pagerank: float
+
+class CommunityResponse(BaseModel):
+    id: str
+    level: int
+    size: int
+    parent: Optional[str] = None
+    label: str
+    top_entities: List[str]
+
+class GraphAnalysisResponse(BaseModel):
+    nodes: List[NodeMetrics]
+    communities: List[CommunityResponse]
+    levels: int
+
+# Entity vector index
+class IndexEntitiesRequest(BaseModel):
+    nodes: List[NodeResponse]
+
+class IndexEntitiesResponse(BaseModel):
+    embedded: int
+    total: int
+
+class EntityHit(BaseModel):
+    id: str
+    label: str
+    type: str
+    description: Optional[str] = None
+    score: float
+
+class EntitySearchResponse(BaseModel):
+    results: List[EntityHit]
+
+class MergeSuggestionsRequest(BaseModel):
+    # Restrict suggestions to these entities (e.g. one graph); whole corpus when omitted
+    ids: Optional[List[str]] = None
+    threshold: float = MERGE_THRESHOLD
+
+class MergeSuggestion(BaseModel):
+    source: str
+    target: str
+    source_label: str
+    target_label: str
+    score: float
+
+class MergeSuggestionsResponse(BaseModel):
+    suggestions: List[MergeSuggestion]
+
+# GraphRAG-style retrieval
+class QueryRequest(BaseModel):
+    question: str
+    k: int = 8
+
+class RetrievedChunk(BaseModel):
+    id: str
+    doc_id: Optional[str] = None
+    filename: Optional[str] = None
+    section: Optional[str] = None
+    text: str
+    score: float
+    matched_by: List[str]
+    entities: List[str]
+
+class QueryResponse(BaseModel):
+    chunks: List[RetrievedChunk]
+    nodes: List[NodeResponse]
+    edges: List[EdgeResponse]
+
 @app.get("/", response_model=HealthResponse)
 async def root():
     return HealthResponse(status="ok", message="Axon API is running")
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    return HealthResponse(status="healthy", message="All systems operational")
+    # Queue depths of this worker: admission per endpoint, and calls waiting for OpenAI quota
+    queues = {limiter.name: limiter.stats() for limiter in ADMISSION_LIMITERS.values()}
+    queues["openai_rate_limit"] = {"llm": llm_limiter.queue_depth(), "embeddings": embedding_limiter.queue_depth()}
+    return HealthResponse(status="healthy", message="All systems operational", queues=queues)
+
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """Readiness: 200 once warm-up (imports, clients, prompt fetch) is done, 503 before"""
+    body = ReadinessResponse(ready=readiness["ready"], steps=readiness["steps"])
+    if not body.ready:
+        return JSONResponse(status_code=503, content=body.model_dump())
+    return body
+
+def convert_pdf_to_markdown(pdf_path: str) -> str:
+    """Opens the spooled PDF from disk, checks the page limit and converts it to markdown"""
+    import fitz
+    import pymupdf4llm
+
+    with fitz.open(pdf_path, filetype="pdf") as doc:
+        check_page_count(doc.page_count)
+        if PARSE_MODE == "fast":
+            return convert_pdf_fast(doc)
+        return pymupdf4llm.to_markdown(doc)
+
+def chunk_all_sections(sections: List[dict], filename: str, doc_id: Optional[str] = None) -> tuple[List[dict], int]:
+    """Chunks every section; a section that fails is skipped. Returns (chunks, failed section count)."""
+    all_chunks = []
+    failed = 0
+    for index, sec in enumerate(sections):
+        try:
+            section_chunks = semantic_chunk_text(
+                text=sec['text'], 
+                filename=filename,
+                section_name=sec['section'],
+                doc_id=doc_id,
+                section_index=index
+            )
+        except Exception as e:
+            logger.error(f"Error chunking section {sec['section']} of {filename}: {e}")
+            failed += 1
+            continue
+        all_chunks.extend(section_chunks)
+
+    # Persist chunks (text, BM25 postings, splitter embeddings) for retrieval,
+    # then drop the embeddings from what is returned and cached
+    index_chunks(all_chunks)
+    for chunk in all_chunks:
+        chunk.pop("embedding", None)
+    return all_chunks, failed
 
 @app.post("/parse-pdf", response_model=ParsePDFResponse)
 async def parse_pdf(file: UploadFile = File(...)):
     """Step 1: Upload PDF and convert to markdown, extract sections"""
     logger.info(f"Parsing PDF: {file.filename}")
     
+    pdf_path = None
     try:
-        pdf_bytes = await file.read()
-        
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-            md_text = pymupdf4llm.to_markdown(doc)
+        # Spool to disk in chunks and let MuPDF read from the file, instead of holding the bytes in memory
+        pdf_path, doc_id = await spool_upload(file)
+
+        # Same PDF already parsed (by any worker) the same way: serve it from the shared document store
+        cache_key = f"{doc_id}:{PARSE_MODE}:{PARSER_VERSION}"
+        cached = await run_blocking(document_store.get, cache_key)
+        if cached:
+            logger.info(f"Serving cached parse for {file.filename} ({doc_id[:12]})")
+            return ParsePDFResponse(**cached)
+
+        md_text = await run_blocking(convert_pdf_to_markdown, pdf_path)
 
         if not md_text:
             raise ValueError("No text extracted from PDF")
@@ -104,33 +320,55 @@ async def parse_pdf(file: UploadFile = File(...)):
         sections = extract_sections_from_markdown(md_text)
         logger.info(f"Extracted {len(sections)} sections from {file.filename}")
         
-        return ParsePDFResponse(
+        response = ParsePDFResponse(
+            doc_id=doc_id,
             markdown=md_text,
             sections=sections,
             section_count=len(sections)
         )
+        await run_blocking(document_store.set, cache_key, response.model_dump())
+        return response
 
+    except HTTPException as e:
+        logger.warning(f"Rejected {file.filename}: {e.detail}")
+        raise
     except Exception as e:
         logger.error(f"Error parsing {file.filename}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if pdf_path:
+            os.unlink(pdf_path)
+
+def use_tenant(tenant: Optional[str], job: Optional[str] = None) -> None:
+    """
+    OpenAI calls made for this request are rate-limited fairly per tenant: the X-Axon-Tenant
+    header if the caller sends one, otherwise the document (job) being processed
+    """
+    current_tenant.set(tenant or job or "default")
 
 @app.post("/chunk-sections", response_model=ChunkResponse)
-async def chunk_sections(request: ChunkSectionsRequest):
+async def chunk_sections(request: ChunkSectionsRequest, x_axon_tenant: Optional[str] = Header(None)):
     """Step 2: Semantic chunking of sections"""
+    use_tenant(x_axon_tenant, request.doc_id)
     logger.info(f"Chunking {len(request.sections)} sections for {request.filename}")
     
     try:
-        all_chunks = []
-        
-        for sec in request.sections:
-            section_chunks = semantic_chunk_text(
-                text=sec['text'], 
-                filename=request.filename,
-                section_name=sec['section']
-            )
-            all_chunks.extend(section_chunks)
+        cache_key = hashlib.sha256(
+            json.dumps([request.filename, request.doc_id, request.sections], sort_keys=True).encode()
+        ).hexdigest()
+        all_chunks = await run_blocking(chunk_cache.get, cache_key)
+
+        if all_chunks is None:
+            all_chunks, failed = await run_blocking(chunk_all_sections, request.sections, request.filename, request.doc_id)
+            # An incomplete result is returned but not cached, so a retry chunks the failed sections again
+            if all_chunks and not failed:
+                await run_blocking(chunk_cache.set, cache_key, all_chunks)
         
         logger.info(f"Created {len(all_chunks)} chunks")
+
+        # Extraction order hint for clients: the most informative chunks first
+        for chunk in all_chunks:
+            chunk["priority"] = chunk_priority(chunk)
         
         return ChunkResponse(
             chunks=all_chunks,
@@ -141,35 +379,240 @@ async def chunk_sections(request: ChunkSectionsRequest):
         logger.error(f"Error chunking sections: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def to_compact_graph(nodes: List[NodeResponse], edges: List[EdgeResponse]) -> CompactGraph:
+    """Request models -> the internal graph form that layout, analysis and stores work on"""
+    graph = CompactGraph()
+    for node in nodes:
+        graph.add_node(node.id, node.label, node.type, node.properties)
+    for edge in edges:
+        graph.add_edge(edge.source, edge.target, edge.relationship, edge.properties)
+    return graph
+
+def upstream_http_error(e: UpstreamError) -> HTTPException:
+    """Reports provider failures as failures (never as an empty extraction), with a retry hint"""
+    if isinstance(e, (CircuitOpenError, QuotaExhausted)):
+        status_code = 503
+    elif isinstance(e, DeadlineExceeded):
+        status_code = 504
+    else:
+        status_code = 502
+    headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+    return HTTPException(status_code=status_code, detail=str(e), headers=headers)
+
 @app.post("/extract-chunk", response_model=ExtractChunkResponse)
-async def extract_chunk(request: ExtractChunkRequest):
+async def extract_chunk(request: ExtractChunkRequest, x_axon_tenant: Optional[str] = Header(None)):
     """Step 3: Extract knowledge graph from a single chunk"""
+    use_tenant(x_axon_tenant, request.chunk.get('metadata', {}).get('doc_id'))
     try:
-        graph = extract_graph_from_chunk(request.chunk['text'], request.chunk['metadata'])
-        
-        nodes = [
-            NodeResponse(
-                id=node.id,
-                label=node.label,
-                type=node.type,
-                properties=node.properties.model_dump() if node.properties else None
-            )
-            for node in graph.nodes
-        ]
+        extraction = await run_blocking(extract_graph_from_chunk, request.chunk['text'], request.chunk['metadata'])
+        graph = CompactGraph.from_extraction(extraction)
         
-        edges = [
-            EdgeResponse(
-                source=edge.source,
-                target=edge.target,
-                relationship=edge.relationship,
-                properties=edge.properties.model_dump() if edge.properties else None
-            )
-            for edge in graph.edges
-        ]
+        # Merge into the stored graph, linked to the chunk for retrieval
+        await run_blocking(save_chunk_graph, request.chunk.get('id'), graph)
         
-        logger.debug(f"Extracted {len(nodes)} nodes, {len(edges)} edges from chunk")
-        return ExtractChunkResponse(nodes=nodes, edges=edges)
+        logger.debug(f"Extracted {graph.node_count} nodes, {graph.edge_count} edges from chunk")
+        return ExtractChunkResponse(nodes=list(graph.node_dicts()), edges=list(graph.edge_dicts()))
 
+    except UpstreamError as e:
+        logger.error(f"Extraction failed: {e}")
+        raise upstream_http_error(e)
     except Exception as e:
         logger.error(f"Error extracting from chunk: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/extract-chunk/stream")
+async def extract_chunk_stream(request: ExtractChunkRequest, x_axon_tenant: Optional[str] = Header(None)):
+    """
+    Step 3, streaming: NDJSON lines {"type": "node"|"edge", "data": ...} sent as each entity
+    or relation is parsed, then {"type": "done"} (or {"type": "error", "detail": ...} mid-stream).
+    Failures before the first item are returned as HTTP errors, like /extract-chunk.
+    """
+    use_tenant(x_axon_tenant, request.chunk.get('metadata', {}).get('doc_id'))
+    try:
+        items = await run_blocking(stream_graph_from_chunk, request.chunk['text'], request.chunk['metadata'])
+    except UpstreamError as e:
+        logger.error(f"Extraction failed: {e}")
+        raise upstream_http_error(e)
+    except Exception as e:
+        logger.error(f"Error extracting from chunk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def lines():
+        graph = CompactGraph()
+        try:
+            async for item in iterate_blocking(items):
+                if isinstance(item, Entity):
+                    if graph.has_node(item.id):
+                        continue
+                    data = graph.node_dict(graph.add_entity(item))
+                    yield json.dumps({"type": "node", "data": data}) + "\n"
+                elif graph.add_relation(item):
+                    data = graph.edge_dict(graph.edge_count - 1)
+                    yield json.dumps({"type": "edge", "data": data}) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming extraction failed: {e}")
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+            return
+
+        # Merge into the stored graph once the chunk is complete, like /extract-chunk
+        await run_blocking(save_chunk_graph, request.chunk.get('id'), graph)
+        yield json.dumps({"type": "done", "node_count": graph.node_count, "edge_count": graph.edge_count}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/process-pdf")
+async def process_pdf(file: UploadFile = File(...), x_axon_tenant: Optional[str] = Header(None)):
+    """
+    Steps 1-3 in one pass for large PDFs: the document is converted, chunked and extracted in
+    windows of pages, with stages overlapping and each chunk's graph merged into the store, so
+    memory use doesn't grow with the document. Streams NDJSON progress lines
+    ({"type": "window"|"chunk"|"done"|"error", ...}); the graph is read from /graph/document/{doc_id}.
+    """
+    logger.info(f"Processing PDF in page windows: {file.filename}")
+
+    pdf_path = None
+    try:
+        pdf_path, doc_id = await spool_upload(file, PIPELINE_MAX_UPLOAD_MB)
+        use_tenant(x_axon_tenant, doc_id)
+        pipeline = await run_blocking(PagePipeline, pdf_path, file.filename, doc_id)
+        check_page_count(pipeline.page_count, PIPELINE_MAX_PAGES)
+    except HTTPException as e:
+        logger.warning(f"Rejected {file.filename}: {e.detail}")
+        if pdf_path:
+            os.unlink(pdf_path)
+        raise
+    except Exception as e:
+        logger.error(f"Error processing {file.filename}: {e}")
+        if pdf_path:
+            os.unlink(pdf_path)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def lines():
+        try:
+            async for event in iterate_blocking(pipeline.events()):
+                yield json.dumps(event) + "\n"
+        finally:
+            os.unlink(pdf_path)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/graph/document/{doc_id}", response_model=GraphResponse)
+async def get_document_graph(doc_id: str, max_nodes: int = Query(300, ge=1, le=MAX_LAYOUT_NODES)):
+    """A bounded view of one document's stored graph: its most mentioned entities and the edges among them"""
+    try:
+        graph = await run_blocking(document_graph, doc_id, max_nodes)
+        return GraphResponse(nodes=list(graph.node_dicts()), edges=list(graph.edge_dicts()))
+
+    except Exception as e:
+        logger.error(f"Error loading document graph: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/graph/layout", response_model=GraphLayoutResponse)
+async def graph_layout(request: GraphLayoutRequest):
+    """Collapse large graphs into aggregate nodes and precompute coordinates for rendering"""
+    try:
+        graph = await run_blocking(to_compact_graph, request.nodes, request.edges)
+        result = await run_blocking(
+            layout_graph,
+            graph,
+            request.max_nodes,
+            request.expand,
+            request.groups
+        )
+        logger.debug(f"Laid out {len(result['nodes'])} of {len(request.nodes)} nodes")
+        return GraphLayoutResponse(**result)
+
+    except Exception as e:
+        logger.error(f"Error computing graph layout: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/graph/analyze", response_model=GraphAnalysisResponse)
+async def graph_analyze(request: GraphRequest):
+    """Degree/PageRank centrality and a community hierarchy for the merged graph"""
+    try:
+        graph = await run_blocking(to_compact_graph, request.nodes, request.edges)
+        result = await run_blocking(analyze_graph, graph)
+        logger.info(f"Found {sum(c['level'] == 0 for c in result['communities'])} communities in {len(request.nodes)} nodes")
+        return GraphAnalysisResponse(**result)
+
+    except Exception as e:
+        logger.error(f"Error analyzing graph: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/graph/export/{name}")
+async def export_graph(name: str):
+    """
+    Streams the stored corpus graph in batches: graph.jsonl, graph.graphml,
+    or the nodes/edges tables as nodes.parquet, edges.parquet, nodes.arrow, edges.arrow
+    """
+    table, _, file_format = name.partition(".")
+    if file_format in COLUMNAR_FORMATS and table in ("nodes", "edges"):
+        try:
+            chunks = await run_blocking(export_columnar, table, file_format)
+        except Exception as e:
+            logger.error(f"Error exporting graph: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    elif name == "graph.jsonl":
+        chunks = export_jsonl()
+    elif name == "graph.graphml":
+        chunks = export_graphml()
+    else:
+        raise HTTPException(
+            status_code=404,
+            detail="Unknown export; use graph.jsonl, graph.graphml, or {nodes,edges}.{parquet,arrow}"
+        )
+
+    return StreamingResponse(
+        iterate_blocking(chunks),
+        media_type=EXPORT_FORMATS[file_format],
+        headers={"Content-Disposition": f'attachment; filename="axon-{name}"'}
+    )
+
+@app.post("/entities/index", response_model=IndexEntitiesResponse)
+async def index_entities(request: IndexEntitiesRequest, x_axon_tenant: Optional[str] = Header(None)):
+    """Embed new or changed entities (label + description) into the entity vector index"""
+    use_tenant(x_axon_tenant)
+    try:
+        embedded = await run_blocking(entity_index.add, [node.model_dump() for node in request.nodes])
+        total = await run_blocking(entity_index.size)
+        return IndexEntitiesResponse(embedded=embedded, total=total)
+
+    except Exception as e:
+        logger.error(f"Error indexing entities: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/entities/search", response_model=EntitySearchResponse)
+async def search_entities(q: str, k: int = 10, type: Optional[str] = None, x_axon_tenant: Optional[str] = Header(None)):
+    """Semantic entity search over the vector index"""
+    use_tenant(x_axon_tenant)
+    try:
+        results = await run_blocking(entity_index.search, q, k, type)
+        return EntitySearchResponse(results=results)
+
+    except Exception as e:
+        logger.error(f"Error searching entities: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/entities/merge-suggestions", response_model=MergeSuggestionsResponse)
+async def merge_suggestions(request: MergeSuggestionsRequest):
+    """Near-duplicate entity pairs (same type, high cosine similarity) that could be merged"""
+    try:
+        suggestions = await run_blocking(entity_index.merge_suggestions, request.ids, request.threshold)
+        return MergeSuggestionsResponse(suggestions=suggestions)
+
+    except Exception as e:
+        logger.error(f"Error computing merge suggestions: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/query", response_model=QueryResponse)
+async def query(request: QueryRequest, x_axon_tenant: Optional[str] = Header(None)):
+    """Retrieve chunks (BM25 + vectors + entity mentions) and their graph neighbourhood"""
+    use_tenant(x_axon_tenant)
+    try:
+        result = await run_blocking(query_corpus, request.question, request.k)
+        logger.info(f"Query returned {len(result['chunks'])} chunks, {len(result['nodes'])} entities")
+        return QueryResponse(**result)
+
+    except Exception as e:
+        logger.error(f"Error answering query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
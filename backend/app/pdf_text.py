@@ -0,0 +1,171 @@
+import os
+import re
+from collections import Counter
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# "fast": markdown straight from PyMuPDF's text spans, with headers found by font size and weight;
+# pages that fail the quality checks below go through pymupdf4llm. "full": pymupdf4llm for every page.
+PARSE_MODE = os.getenv("PARSE_MODE", "fast")
+# Part of the parse cache key: bump it when a change here or in section extraction alters the output
+PARSER_VERSION = 1
+
+# A page with less text than this but with images is a figure or scan page
+MIN_PAGE_CHARS = 200
+# Share of short numeric lines above which a page is laid out as a table
+MAX_TABLE_LINE_SHARE = 0.35
+MIN_TABLE_LINES = 10
+# Large-font lines that can't be read as headers (drop caps, display math, multi-part titles)
+MAX_MISSED_HEADERS = 2
+MAX_GARBLED_SHARE = 0.02
+
+HEADER_SIZE_RATIO = 1.1
+TITLE_SIZE_RATIO = 1.5
+MAX_HEADER_CHARS = 100
+MAX_HEADER_WORDS = 14
+
+BOLD_FLAG = 16  # TEXT_FONT_BOLD
+TABLE_CELL = re.compile(r"[-+±−–()\[\]\d.,:;%/×x*\s]{1,24}")
+PAGE_NUMBER = re.compile(r"\d{1,4}")
+SECTION_NUMBER = re.compile(r"(?:\d+|[A-Z])(?:\.\d+)*\.?")
+
+
+def _is_bold(span: dict) -> bool:
+    return bool(span["flags"] & BOLD_FLAG) or "bold" in span["font"].lower()
+
+
+def _looks_like_header(text: str) -> bool:
+    # A section number set on its own line ("3.1") starts a header continued on the next line
+    if SECTION_NUMBER.fullmatch(text):
+        return True
+    return (
+        len(text) <= MAX_HEADER_CHARS
+        and len(text.split()) <= MAX_HEADER_WORDS
+        and not text.endswith((".", ",", ";", ":"))
+        and any(c.isalpha() for c in text)
+    )
+
+
+def _body_size(blocks: list[dict]) -> float | None:
+    """The font size most of the page's characters are set in"""
+    sizes = Counter()
+    for block in blocks:
+        for line in block["lines"]:
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    return sizes.most_common(1)[0][0] if sizes else None
+
+
+def page_markdown(page, body_size: float | None = None) -> tuple[str, str | None, float | None]:
+    """
+    Markdown for one page from its text spans: lines set larger than the body text become
+    `#`/`##` headers, short all-bold lines become `**...**` headers, other lines are joined into paragraphs.
+    Returns (markdown, why the page needs full conversion or None, body font size).
+    `body_size` is the previous page's, used when this page has too little text to tell.
+    """
+    import fitz
+
+    flags = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP | fitz.TEXT_DEHYPHENATE
+    blocks = [b for b in page.get_text("dict", flags=flags)["blocks"] if b["type"] == 0]
+    page_chars = sum(len(s["text"].strip()) for b in blocks for line in b["lines"] for s in line["spans"])
+    if page_chars >= MIN_PAGE_CHARS or body_size is None:
+        body_size = _body_size(blocks) or body_size
+
+    parts = []
+    line_count = table_lines = missed_headers = garbled = 0
+    for block in blocks:
+        paragraph = []
+        header = None
+        for line in block["lines"]:
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if not spans:
+                continue
+            text = " ".join("".join(s["text"] for s in line["spans"]).split())
+            size = max(s["size"] for s in spans)
+            large = body_size is not None and size >= body_size * HEADER_SIZE_RATIO
+            # Bold lines inside a paragraph are emphasis, not headers
+            bold = not paragraph and all(_is_bold(s) for s in spans)
+            # Page numbers are dropped; a large or bold number is a section number
+            if PAGE_NUMBER.fullmatch(text) and not (large or bold):
+                continue
+            line_count += 1
+            garbled += text.count("�")
+
+            # A bare section number ("3.1") takes the next line as its title, whatever its font
+            if header and SECTION_NUMBER.fullmatch(header[1]) and _looks_like_header(text):
+                header = (header[0], f"{header[1]} {text}")
+                continue
+            if (large or bold) and _looks_like_header(text):
+                if paragraph:
+                    parts.append(" ".join(paragraph))
+                    paragraph = []
+                # Consecutive header lines of one block are one (wrapped) header
+                level = "#" if large and size >= body_size * TITLE_SIZE_RATIO else "##" if large else "**"
+                if header and header[0] == level:
+                    header = (level, f"{header[1]} {text}")
+                else:
+                    if header:
+                        parts.append(_header(*header))
+                    header = (level, text)
+                continue
+            if header:
+                parts.append(_header(*header))
+                header = None
+            if large:
+                missed_headers += 1
+            if TABLE_CELL.fullmatch(text):
+                table_lines += 1
+            paragraph.append(text)
+        if header:
+            parts.append(_header(*header))
+        if paragraph:
+            parts.append(" ".join(paragraph))
+
+    if page_chars < MIN_PAGE_CHARS and page.get_images():
+        problem = "little text on a page with images"
+    elif page_chars and garbled / page_chars > MAX_GARBLED_SHARE:
+        problem = "unmapped characters"
+    elif line_count >= MIN_TABLE_LINES and table_lines / line_count > MAX_TABLE_LINE_SHARE:
+        problem = "table layout"
+    elif missed_headers > MAX_MISSED_HEADERS:
+        problem = "large text not recognised as headers"
+    else:
+        problem = None
+    return "\n\n".join(parts), problem, body_size
+
+
+def _header(level: str, text: str) -> str:
+    return f"**{text}**" if level == "**" else f"{level} {text}"
+
+
+def convert_pages(doc, pages, body_size: float | None = None) -> tuple[str, float | None]:
+    """
+    Text-only conversion of some pages of an open PDF: each page through page_markdown, except pages
+    that fail its quality checks, which get pymupdf4llm's full layout analysis (tables, figures, columns).
+    Returns (markdown, body font size of the last page) so a following window of pages can continue.
+    """
+    import pymupdf4llm
+
+    converted: dict[int, str] = {}
+    fallback: list[int] = []
+    for number in pages:
+        page = doc[number]
+        markdown, problem, body_size = page_markdown(page, body_size)
+        converted[number] = markdown
+        if problem:
+            logger.debug(f"Page {number + 1}: {problem}, using full conversion")
+            fallback.append(number)
+
+    if fallback:
+        logger.info(f"Fast parse: {len(fallback)} of {len(converted)} pages need full conversion")
+        chunks = pymupdf4llm.to_markdown(doc, pages=fallback, page_chunks=True)
+        for number, chunk in zip(fallback, chunks):
+            converted[number] = chunk["text"]
+    return "\n\n".join(page for page in converted.values() if page.strip()), body_size
+
+
+def convert_pdf_fast(doc) -> str:
+    """Text-only conversion of a whole open PDF (see convert_pages)"""
+    return convert_pages(doc, range(doc.page_count))[0]
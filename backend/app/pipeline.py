@@ -0,0 +1,220 @@
+import contextvars
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+from loguru import logger
+from .chunk_builder import HEADER_PATTERN, extract_sections_from_markdown, semantic_chunk_text
+from .chunk_priority import chunk_priority
+from .graph_model import CompactGraph
+from .graph_store import save_chunk_graph, document_graph_size
+from .ontology import extract_graph_from_chunk
+from .pdf_text import PARSE_MODE, convert_pages
+from .retrieval import index_chunks
+
+load_dotenv()
+
+# Pages converted at a time; memory use follows the window size, not the document length
+PIPELINE_WINDOW_PAGES = int(os.getenv("PIPELINE_WINDOW_PAGES", "16"))
+# Converted windows allowed to wait for chunking, and chunks per extraction thread allowed to wait
+# for extraction. A full queue blocks the stage before it (backpressure).
+PIPELINE_QUEUED_WINDOWS = int(os.getenv("PIPELINE_QUEUED_WINDOWS", "2"))
+PIPELINE_EXTRACT_CONCURRENCY = int(os.getenv("PIPELINE_EXTRACT_CONCURRENCY", "8"))
+PIPELINE_QUEUED_CHUNKS = 2 * PIPELINE_EXTRACT_CONCURRENCY
+# A section still open at the end of a window is carried into the next one, up to this size
+PIPELINE_MAX_CARRY_CHARS = int(os.getenv("PIPELINE_MAX_CARRY_CHARS", "200000"))
+
+# How often blocked stages check whether the pipeline was stopped
+_POLL_SECONDS = 0.5
+_DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised inside a stage when the pipeline was stopped (a stage failed or the client went away)"""
+
+
+def split_open_section(markdown: str) -> tuple[str, str]:
+    """
+    Splits converted markdown at its last section header: (complete sections, last section).
+    The last section may continue on the next pages, so it is carried over rather than chunked.
+    A carry-over above PIPELINE_MAX_CARRY_CHARS is chunked anyway and continues under the same header.
+    """
+    last = None
+    for last in HEADER_PATTERN.finditer(markdown):
+        pass
+    split_at = last.start() if last else 0
+    complete, open_section = markdown[:split_at], markdown[split_at:]
+    if len(open_section) > PIPELINE_MAX_CARRY_CHARS:
+        complete, open_section = markdown, f"{last.group(0)}\n\n" if last else ""
+    return complete, open_section
+
+
+class PagePipeline:
+    """
+    Processes a PDF in windows of pages: convert, split into sections, chunk, extract and merge into
+    the graph store. Each stage runs on its own thread(s), connected by bounded queues, so stages
+    overlap in time and a slow stage holds back the ones before it instead of letting work pile up.
+    Only the current windows and chunks are held in memory; the graph lives in the store.
+    Progress is reported by events().
+    """
+
+    def __init__(self, pdf_path: str, filename: str, doc_id: str):
+        import fitz
+
+        self.pdf_path = pdf_path
+        self.filename = filename
+        self.doc_id = doc_id
+        with fitz.open(pdf_path, filetype="pdf") as doc:
+            self.page_count = doc.page_count
+
+        self._windows = queue.Queue(maxsize=PIPELINE_QUEUED_WINDOWS)
+        self._chunks = queue.Queue(maxsize=PIPELINE_QUEUED_CHUNKS)
+        self._events = queue.Queue(maxsize=4 * PIPELINE_QUEUED_CHUNKS)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._error: Exception | None = None
+        self.section_count = 0
+        self.chunk_count = 0
+        self.failed_chunks = 0
+
+    def _put(self, q: queue.Queue, item) -> None:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+        raise PipelineStopped
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        raise PipelineStopped
+
+    def _convert(self) -> None:
+        """Stage 1: markdown for each window of pages"""
+        import fitz
+        import pymupdf4llm
+
+        body_size = None
+        with fitz.open(self.pdf_path, filetype="pdf") as doc:
+            for start in range(0, doc.page_count, PIPELINE_WINDOW_PAGES):
+                pages = range(start, min(start + PIPELINE_WINDOW_PAGES, doc.page_count))
+                if PARSE_MODE == "fast":
+                    markdown, body_size = convert_pages(doc, pages, body_size)
+                else:
+                    markdown = pymupdf4llm.to_markdown(doc, pages=list(pages))
+                # Let MuPDF drop the fonts and images it cached for these pages
+                fitz.TOOLS.store_shrink(100)
+                self._put(self._windows, (pages, markdown))
+        self._put(self._windows, _DONE)
+
+    def _chunk(self) -> None:
+        """Stage 2: complete sections of each window into indexed chunks, the open one carried over"""
+        carry = ""
+        while (item := self._get(self._windows)) is not _DONE:
+            pages, markdown = item
+            complete, carry = split_open_section(f"{carry}\n\n{markdown}" if carry else markdown)
+            self._chunk_sections(complete, pages)
+        self._chunk_sections(carry, None)
+        for _ in range(PIPELINE_EXTRACT_CONCURRENCY):
+            self._put(self._chunks, _DONE)
+
+    def _chunk_sections(self, markdown: str, pages: range | None) -> None:
+        sections = extract_sections_from_markdown(markdown) if markdown.strip() else []
+        chunks = []
+        # Sections are numbered across windows (only this stage updates section_count)
+        for index, section in enumerate(sections, start=self.section_count):
+            try:
+                chunks.extend(semantic_chunk_text(
+                    section["text"], self.filename, section["section"], self.doc_id, section_index=index
+                ))
+            except Exception as e:
+                # A failed section is skipped, like in /chunk-sections
+                logger.error(f"Error chunking section {section['section']} of {self.filename}: {e}")
+        index_chunks(chunks)
+        for chunk in chunks:
+            chunk.pop("embedding", None)
+        with self._lock:
+            self.section_count += len(sections)
+            self.chunk_count += len(chunks)
+
+        event = {"type": "window", "sections": len(sections), "chunks": len(chunks)}
+        if pages is not None:
+            event.update(first_page=pages.start + 1, last_page=pages.stop, page_count=self.page_count)
+        self._put(self._events, event)
+        # The window's most informative chunks are extracted first
+        for chunk in sorted(chunks, key=chunk_priority, reverse=True):
+            self._put(self._chunks, chunk)
+
+    def _extract(self) -> None:
+        """Stage 3: extraction of each chunk, merged into the stored graph"""
+        while (chunk := self._get(self._chunks)) is not _DONE:
+            event = {"type": "chunk", "id": chunk["id"], "section": chunk["metadata"].get("section")}
+            try:
+                extraction = extract_graph_from_chunk(chunk["text"], chunk["metadata"])
+                graph = CompactGraph.from_extraction(extraction)
+                save_chunk_graph(chunk["id"], graph)
+                event.update(node_count=graph.node_count, edge_count=graph.edge_count)
+            except Exception as e:
+                # One failed chunk is skipped, like in the UI's per-chunk extraction
+                logger.warning(f"Pipeline extraction failed for a chunk of {self.filename}: {e}")
+                with self._lock:
+                    self.failed_chunks += 1
+                event["error"] = str(e)
+            self._put(self._events, event)
+
+    def _run(self, stage) -> None:
+        try:
+            stage()
+        except PipelineStopped:
+            pass
+        except Exception as e:
+            logger.error(f"Pipeline stage {stage.__name__} failed for {self.filename}: {e}")
+            self._error = e
+            self._stop.set()
+
+    def events(self):
+        """
+        Runs the pipeline, yielding progress events: {"type": "window"} per converted window,
+        {"type": "chunk"} per extracted chunk, then {"type": "done"} or {"type": "error"}.
+        Closing the generator early stops the stages.
+        """
+        stages = [self._convert, self._chunk] + [self._extract] * PIPELINE_EXTRACT_CONCURRENCY
+        threads = []
+        for i, stage in enumerate(stages):
+            # Each thread gets its own copy of the caller's context (tenant for rate limiting)
+            ctx = contextvars.copy_context()
+            thread = threading.Thread(
+                target=ctx.run, args=(self._run, stage), name=f"axon-pipeline-{i}", daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        try:
+            while True:
+                try:
+                    yield self._events.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in threads) and self._events.empty():
+                        break
+
+            if self._error is not None:
+                yield {"type": "error", "detail": str(self._error)}
+                return
+            node_count, edge_count = document_graph_size(self.doc_id)
+            yield {
+                "type": "done",
+                "doc_id": self.doc_id,
+                "page_count": self.page_count,
+                "section_count": self.section_count,
+                "chunk_count": self.chunk_count,
+                "failed_chunks": self.failed_chunks,
+                "node_count": node_count,
+                "edge_count": edge_count,
+            }
+        finally:
+            self._stop.set()
@@ -0,0 +1,281 @@
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from dotenv import load_dotenv
+from loguru import logger
+from .resilience import QuotaExhausted, retry_after_seconds
+from .store import transaction
+
+load_dotenv()
+
+# OpenAI quota for the account (0 = unlimited). Limits are shared by all worker processes.
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+EMBED_RPM = float(os.getenv("EMBED_RPM", "0"))
+EMBED_TPM = float(os.getenv("EMBED_TPM", "0"))
+# Tokens reserved for a completion before its usage is known (corrected from the response)
+COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "1500"))
+CHARS_PER_TOKEN = 4
+
+# Who an upstream call is made for: the caller's tenant header or the document being processed.
+# Context variables follow the request into run_blocking and the attempt pool.
+current_tenant: contextvars.ContextVar[str] = contextvars.ContextVar("axon_tenant", default="default")
+
+TOTAL_TOKENS = re.compile(rb'"total_tokens"\s*:\s*(\d+)')
+
+
+class Reservation:
+    __slots__ = ("tenant", "tokens")
+
+    def __init__(self, tenant: str, tokens: float):
+        self.tenant = tenant
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """
+    Admits upstream calls within a requests-per-minute and a tokens-per-minute quota.
+    Both are token buckets (refilled continuously, holding at most one minute of quota) kept in the
+    shared database, so all workers draw on the same quota. Reservations use estimated tokens and are
+    corrected once the response reports its usage.
+    Waiting calls are served fairly: the tenant granted the fewest tokens so far goes next, FIFO within
+    a tenant, so one large job can't starve the others.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self._cond = threading.Condition()
+        self._queues: dict[str, deque[Reservation]] = {}
+        self._served: dict[str, float] = {}
+        # Set while a reservation runs its bucket transaction (outside the lock)
+        self._taking = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _next(self) -> Reservation:
+        tenant = min(self._queues, key=self._served.__getitem__)
+        return self._queues[tenant][0]
+
+    @staticmethod
+    def _shortfall(level: float, needed: float, per_minute: float) -> float:
+        """Seconds until a bucket holds `needed` (0 when it already does, or is unlimited)"""
+        if per_minute <= 0 or level >= needed:
+            return 0.0
+        return (needed - level) * 60 / per_minute
+
+    def _take(self, tokens: float) -> float:
+        """Takes one request and `tokens` from the buckets; returns 0, or the seconds until they'd be there"""
+        now = time.time()
+        with transaction() as conn:
+            row = conn.execute(
+                "SELECT requests, tokens, paused_until, updated_at FROM rate_buckets WHERE name = ?",
+                (self.name,)
+            ).fetchone()
+            if row is None:
+                requests, available, paused_until = self.rpm, self.tpm, 0.0
+            else:
+                requests, available, paused_until, updated_at = row
+                elapsed = max(now - updated_at, 0.0)
+                requests = min(self.rpm, requests + elapsed * self.rpm / 60)
+                available = min(self.tpm, available + elapsed * self.tpm / 60)
+
+            # A call larger than the whole bucket waits for a full bucket, then leaves it in debt
+            wait = max(
+                paused_until - now,
+                self._shortfall(requests, 1, self.rpm),
+                self._shortfall(available, min(tokens, self.tpm), self.tpm),
+            )
+            if wait <= 0:
+                requests -= 1
+                available -= tokens
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (name, requests, tokens, paused_until, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.name, requests, available, paused_until, now)
+            )
+        return max(wait, 0.0)
+
+    def acquire(self, tokens: float, timeout: float | None = None) -> Reservation:
+        """
+        Blocks until the call fits the quota and it is the current tenant's turn.
+        Raises QuotaExhausted if that takes longer than `timeout` seconds.
+        """
+        reservation = Reservation(current_tenant.get(), tokens)
+        if not self.enabled:
+            return reservation
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            queue = self._queues.get(reservation.tenant)
+            if queue is None:
+                # A tenant (re)joining starts level with the least served waiting one: idle time earns no credit
+                floor = min((self._served[tenant] for tenant in self._queues), default=0.0)
+                self._served[reservation.tenant] = max(self._served.get(reservation.tenant, 0.0), floor)
+                queue = self._queues[reservation.tenant] = deque()
+            queue.append(reservation)
+        wait = 0.0
+        try:
+            while True:
+                with self._cond:
+                    while self._taking or self._next() is not reservation:
+                        self._cond.wait(self._wait_time(deadline, timeout, None))
+                    self._taking = True
+                # The bucket transaction runs without the lock, so other calls can queue and settle meanwhile
+                try:
+                    wait = self._take(tokens)
+                finally:
+                    with self._cond:
+                        self._taking = False
+                        self._cond.notify_all()
+                with self._cond:
+                    if wait == 0:
+                        self._served[reservation.tenant] += tokens
+                        return reservation
+                    # Refunds and releases notify; quota refilling (possibly used by other workers) is waited out
+                    self._cond.wait(self._wait_time(deadline, timeout, wait))
+        finally:
+            with self._cond:
+                queue.remove(reservation)
+                if not queue:
+                    del self._queues[reservation.tenant]
+                    if not self._queues:
+                        self._served.clear()
+                self._cond.notify_all()
+
+    def _wait_time(self, deadline: float | None, timeout: float | None, wait: float | None) -> float | None:
+        """How long to wait for a notification (None: indefinitely); raises QuotaExhausted past the deadline"""
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise QuotaExhausted(
+                f"{self.name}: no rate-limit quota within {timeout:.0f}s",
+                retry_after=max(wait or 0.0, 1.0)
+            )
+        waits = [t for t in (wait, remaining) if t is not None]
+        return min(waits) if waits else None
+
+    def settle(self, reservation: Reservation, actual_tokens: float | None) -> None:
+        """Corrects a reservation with the tokens the call actually used (None keeps the estimate)"""
+        if actual_tokens is None or not self.enabled or self.tpm <= 0:
+            return
+        refund = reservation.tokens - actual_tokens
+        if refund == 0:
+            return
+        with transaction() as conn:
+            conn.execute(
+                "UPDATE rate_buckets SET tokens = MIN(tokens + ?, ?) WHERE name = ?",
+                (refund, self.tpm, self.name)
+            )
+        with self._cond:
+            if reservation.tenant in self._served:
+                self._served[reservation.tenant] -= refund
+            self._cond.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Stops granting calls (in every worker) for `seconds`, after the provider rate-limited one"""
+        if not self.enabled:
+            return
+        with transaction() as conn:
+            conn.execute(
+                "UPDATE rate_buckets SET paused_until = MAX(paused_until, ?) WHERE name = ?",
+                (time.time() + seconds, self.name)
+            )
+        logger.warning(f"{self.name}: rate-limited by the provider, pausing calls for {seconds:.1f}s")
+
+
+llm_limiter = RateLimiter("llm", LLM_RPM, LLM_TPM)
+embedding_limiter = RateLimiter("embeddings", EMBED_RPM, EMBED_TPM)
+
+
+def limiter_for(path: str) -> RateLimiter | None:
+    if path.endswith("/chat/completions"):
+        return llm_limiter
+    if path.endswith("/embeddings"):
+        return embedding_limiter
+    return None
+
+
+def estimate_tokens(path: str, body: bytes) -> float:
+    """Prompt tokens from the request size, plus an allowance for the completion"""
+    tokens = len(body) / CHARS_PER_TOKEN
+    if path.endswith("/chat/completions"):
+        tokens += COMPLETION_TOKENS_ESTIMATE
+    return tokens
+
+
+def used_tokens(body: bytes) -> int | None:
+    """`usage.total_tokens` of an OpenAI response (usage comes last, so the search starts from the end)"""
+    start = body.rfind(b'"total_tokens"')
+    match = TOTAL_TOKENS.match(body, start) if start >= 0 else None
+    return int(match.group(1)) if match else None
+
+
+class RateLimitedTransport:
+    """
+    httpx transport that puts every OpenAI chat and embeddings request (including SDK retries and
+    hedged duplicates) through its rate limiter. A request waits at most its pool timeout for quota,
+    then fails with QuotaExhausted without reaching the provider.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        limiter = limiter_for(request.url.path)
+        if limiter is None or not limiter.enabled:
+            return self._transport.handle_request(request)
+
+        # QuotaExhausted is not an httpx error: the SDK wraps it, and ResilientCaller unwraps it again
+        timeout = request.extensions.get("timeout", {}).get("pool")
+        reservation = limiter.acquire(estimate_tokens(request.url.path, request.content), timeout)
+
+        response = self._transport.handle_request(request)
+        if response.status_code == 429:
+            limiter.pause(retry_after_seconds(response.headers) or 1.0)
+        if response.status_code >= 400:
+            # Rejected calls don't count against the token quota
+            limiter.settle(reservation, 0)
+        elif "text/event-stream" not in response.headers.get("content-type", ""):
+            # JSON responses are complete before they are usable anyway; streams keep their estimate
+            limiter.settle(reservation, used_tokens(response.read()))
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._transport.__exit__(*args)
+
+
+@lru_cache(maxsize=1)
+def get_http_client():
+    """
+    HTTP client for the OpenAI SDK and the embedding models, with rate limiting in front.
+    Pools connections like the SDK's default client and, like httpx, honours HTTP(S)_PROXY/NO_PROXY
+    (httpx only does that itself when no transport is given).
+    """
+    import httpx
+    from httpx._utils import get_environment_proxies
+    from openai import DefaultHttpxClient
+    from openai._constants import DEFAULT_CONNECTION_LIMITS
+
+    def transport(proxy=None):
+        return RateLimitedTransport(httpx.HTTPTransport(limits=DEFAULT_CONNECTION_LIMITS, proxy=proxy))
+
+    mounts = {pattern: transport(proxy) for pattern, proxy in get_environment_proxies().items()}
+    return DefaultHttpxClient(transport=transport(), mounts=mounts)
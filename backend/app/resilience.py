@@ -0,0 +1,245 @@
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from loguru import logger
+from .executor import BLOCKING_POOL_SIZE
+
+# Attempts run here so the caller can return as soon as either a request or its hedge finishes.
+# Abandoned attempts keep their thread until their own timeout expires, hence the headroom.
+_attempt_pool = ThreadPoolExecutor(max_workers=4 * BLOCKING_POOL_SIZE, thread_name_prefix="axon-attempt")
+
+
+class UpstreamError(Exception):
+    """An upstream call failed for good; `retry_after` (seconds) hints when trying again makes sense"""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling the provider while its circuit breaker is open"""
+
+
+class DeadlineExceeded(UpstreamError):
+    """Retries ran out of time (or attempts) before a call succeeded"""
+
+
+class QuotaExhausted(UpstreamError):
+    """Raised without calling the provider when the local rate limiter had no quota for the call in time"""
+
+
+def quota_exhausted(error: BaseException | None) -> QuotaExhausted | None:
+    """The QuotaExhausted behind an error, if any (the OpenAI SDK wraps transport errors in its own)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, QuotaExhausted):
+            return error
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def retry_after_seconds(headers) -> float | None:
+    """Seconds to wait from a Retry-After (or OpenAI's retry-after-ms) header, if there is a valid one"""
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q / 100 * len(samples)), len(samples) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `cooldown` seconds.
+    Then a single probe call is let through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() < self._opened_at + self.cooldown:
+                return "open"
+            return "half-open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(
+                    f"{self.name} is unavailable (circuit open)",
+                    retry_after=max(remaining, 1.0)
+                )
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"{self.name} circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probing = False
+                logger.warning(f"{self.name} circuit opened after {self._failures} consecutive failures")
+
+    def record_skipped(self) -> None:
+        """The call never reached the provider: a probe is given back and the state is unchanged"""
+        with self._lock:
+            self._probing = False
+
+
+class ResilientCaller:
+    """
+    Runs a call under an overall deadline with per-attempt timeouts, retries with full-jitter
+    exponential backoff (or the provider's Retry-After, whichever is longer), an optional hedged
+    duplicate for attempts slower than the observed p95, and a circuit breaker.
+
+    `fn(timeout)` performs one attempt. `is_retryable(exc)` separates transient failures from
+    failures that would repeat, and `retry_after(exc)` extracts the provider's hint, if any.
+    Attempts that found no local rate-limit quota (QuotaExhausted) are raised as they are.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        is_retryable,
+        retry_after,
+        deadline: float = 45.0,
+        attempt_timeout: float = 20.0,
+        max_retries: int = 4,
+        base_backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.name = name
+        self.is_retryable = is_retryable
+        self.retry_after = retry_after
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = LatencyTracker()
+
+    def _timed(self, fn, timeout: float):
+        start = time.monotonic()
+        result = fn(timeout)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _attempt(self, fn, timeout: float):
+        delay = self.latency.percentile(self.hedge_percentile) if self.hedge else None
+        if delay is None or len(self.latency) < self.hedge_min_samples or delay >= timeout:
+            return self._timed(fn, timeout)
+
+        primary = _attempt_pool.submit(contextvars.copy_context().run, self._timed, fn, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        # The first request is slower than p95: race a duplicate against it and keep the first success
+        logger.debug(f"{self.name}: hedging a request still running after {delay:.1f}s")
+        hedge = _attempt_pool.submit(contextvars.copy_context().run, self._timed, fn, timeout - delay)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(self, fn):
+        deadline = time.monotonic() + self.deadline
+        attempts = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = self._attempt(fn, min(self.attempt_timeout, deadline - time.monotonic()))
+            except Exception as e:
+                quota = quota_exhausted(e)
+                if quota is not None:
+                    # Our own throttling says nothing about the provider: no breaker accounting, no retry
+                    self.breaker.record_skipped()
+                    raise quota from e
+                if not self.is_retryable(e):
+                    # The provider answered; the request itself can't succeed
+                    self.breaker.record_success()
+                    raise UpstreamError(f"{self.name} call failed: {e}") from e
+
+                self.breaker.record_failure()
+                attempts += 1
+                hint = self.retry_after(e)
+                backoff = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempts))
+                delay = max(hint or 0.0, backoff)
+                if attempts > self.max_retries or time.monotonic() + delay >= deadline:
+                    raise DeadlineExceeded(
+                        f"{self.name} call failed after {attempts} attempts: {e}",
+                        retry_after=hint
+                    ) from e
+                logger.warning(f"{self.name} attempt {attempts} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
@@ -0,0 +1,244 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+import numpy as np
+from dotenv import load_dotenv
+from loguru import logger
+from .chunk_builder import get_embed_model
+from .entity_index import entity_index
+from .graph_store import chunks_for_entities, entities_for_chunks, load_graph
+from .store import KVStore, get_connection, transaction
+from .vector_index import VectorIndex, normalize
+
+load_dotenv()
+
+# Chunk vectors are the splitter's text-embedding-3 vectors shortened to this many dimensions
+# (text-embedding-3 embeddings stay meaningful when truncated and re-normalized)
+CHUNK_VECTOR_DIM = int(os.getenv("CHUNK_VECTOR_DIM", "512"))
+IVF_MIN_CHUNKS = int(os.getenv("IVF_MIN_CHUNKS", "20000"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Terms in more than this fraction of chunks barely move BM25 scores; skipping them avoids long postings
+BM25_MAX_DF_RATIO = 0.5
+# Reciprocal rank fusion constant
+RRF_K = 60
+# Entities matched against the question, used as seeds for the graph neighbourhood
+SEED_ENTITIES = 5
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be been by can for from has have in into is it its of on or our such that the their
+then there these this to was we were which with within without not no than also using used based
+""".split())
+
+corpus_stats = KVStore("stats")
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def chunk_vector(embedding) -> np.ndarray:
+    """Shortens a full embedding to CHUNK_VECTOR_DIM and re-normalizes it"""
+    return normalize(np.asarray(embedding, dtype=np.float32)[:CHUNK_VECTOR_DIM])[0]
+
+
+def index_chunks(chunks: list[dict]) -> int:
+    """
+    Persists chunks with their BM25 postings and vectors (from the chunk's "embedding").
+    Chunks already in the store are skipped. Returns the number of chunks added.
+    """
+    if not chunks:
+        return 0
+    with transaction() as conn:
+        ids = [c["id"] for c in chunks]
+        existing = set()
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            existing.update(r[0] for r in conn.execute(
+                f"SELECT id FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch
+            ))
+
+        now = time.time()
+        added, added_length = 0, 0
+        for chunk in chunks:
+            if chunk["id"] in existing:
+                continue
+            existing.add(chunk["id"])
+            tokens = tokenize(chunk["text"])
+            metadata = chunk.get("metadata", {})
+            vector = chunk.get("embedding")
+            conn.execute(
+                "INSERT INTO chunks (id, doc_id, filename, section, text, length, vector, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    chunk["id"],
+                    metadata.get("doc_id"),
+                    metadata.get("filename"),
+                    metadata.get("section"),
+                    chunk["text"],
+                    len(tokens),
+                    chunk_vector(vector).astype(np.float16).tobytes() if vector is not None else None,
+                    now,
+                )
+            )
+            term_counts = Counter(tokens)
+            conn.executemany(
+                "INSERT INTO chunk_terms (term, chunk_id, tf) VALUES (?, ?, ?)",
+                [(term, chunk["id"], tf) for term, tf in term_counts.items()]
+            )
+            conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                [(term,) for term in term_counts]
+            )
+            added += 1
+            added_length += len(tokens)
+
+        stats = corpus_stats.get("chunks") or {"count": 0, "total_length": 0}
+        corpus_stats.set("chunks", {
+            "count": stats["count"] + added,
+            "total_length": stats["total_length"] + added_length,
+        })
+
+    logger.info(f"Indexed {added} new chunks")
+    return added
+
+
+def bm25_search(query: str, k: int = 20) -> list[tuple[str, float]]:
+    """BM25 over the inverted index: only the postings of the query terms are read"""
+    stats = corpus_stats.get("chunks")
+    if not stats or not stats["count"]:
+        return []
+    n_chunks = stats["count"]
+    avg_length = stats["total_length"] / n_chunks or 1.0
+
+    conn = get_connection()
+    scores: dict[str, float] = {}
+    for term in set(tokenize(query)):
+        row = conn.execute("SELECT df FROM terms WHERE term = ?", (term,)).fetchone()
+        if not row or row[0] > BM25_MAX_DF_RATIO * n_chunks:
+            continue
+        idf = math.log(1 + (n_chunks - row[0] + 0.5) / (row[0] + 0.5))
+        for chunk_id, tf, length in conn.execute(
+            "SELECT p.chunk_id, p.tf, c.length FROM chunk_terms p JOIN chunks c ON c.id = p.chunk_id WHERE p.term = ?",
+            (term,)
+        ):
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+    return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class ChunkIndex:
+    """
+    Chunk vectors from the shared database, mirrored in a per-worker VectorIndex.
+    The index is updated in place, so searches hold the same lock as refreshes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = VectorIndex(CHUNK_VECTOR_DIM)
+        self._loaded_until = 0.0
+        self._trained_size = 0
+
+    def _refresh(self) -> None:
+        with self._lock:
+            rows = get_connection().execute(
+                "SELECT id, vector, updated_at FROM chunks WHERE updated_at > ? AND vector IS NOT NULL",
+                (self._loaded_until,)
+            ).fetchall()
+            if rows:
+                self._index.add(
+                    [r[0] for r in rows],
+                    np.stack([np.frombuffer(r[1], dtype=np.float16) for r in rows])
+                )
+                self._loaded_until = max(r[2] for r in rows)
+
+            size = len(self._index)
+            if size >= IVF_MIN_CHUNKS and size >= 2 * self._trained_size:
+                start = time.perf_counter()
+                self._index.train()
+                self._trained_size = size
+                logger.info(f"Trained chunk IVF on {size} vectors in {time.perf_counter() - start:.2f}s")
+
+    def search(self, vector: np.ndarray, k: int = 20) -> list[tuple[str, float]]:
+        self._refresh()
+        with self._lock:
+            return self._index.search([vector], k=k, nprobe=IVF_NPROBE)[0]
+
+
+chunk_index = ChunkIndex()
+
+
+def _reciprocal_rank_fusion(*rankings: list[str]) -> dict[str, float]:
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return fused
+
+
+def query_corpus(question: str, k: int = 8) -> dict:
+    """
+    GraphRAG-style retrieval: BM25 hits, vector hits and chunks that mention the entities
+    closest to the question are fused with reciprocal rank fusion. Returns the top chunks
+    plus the graph neighbourhood of the entities they (and the question) mention.
+    """
+    fetch = k * 3
+    lexical = bm25_search(question, fetch)
+    semantic = chunk_index.search(chunk_vector(get_embed_model().get_query_embedding(question)), fetch)
+
+    seeds = [hit["id"] for hit in entity_index.search(question, k=SEED_ENTITIES)]
+    mentions = chunks_for_entities(seeds)
+    graph_ranked = sorted(mentions, key=lambda chunk_id: -len(mentions[chunk_id]))[:fetch]
+
+    fused = _reciprocal_rank_fusion(
+        [chunk_id for chunk_id, _ in lexical],
+        [chunk_id for chunk_id, _ in semantic],
+        graph_ranked,
+    )
+    top = heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+    top_ids = [chunk_id for chunk_id, _ in top]
+
+    conn = get_connection()
+    rows = {}
+    if top_ids:
+        rows = {
+            r[0]: r for r in conn.execute(
+                f"SELECT id, doc_id, filename, section, text FROM chunks WHERE id IN ({','.join('?' * len(top_ids))})",
+                top_ids
+            )
+        }
+    lexical_ids = {chunk_id for chunk_id, _ in lexical}
+    semantic_ids = {chunk_id for chunk_id, _ in semantic}
+    chunk_entities = entities_for_chunks(top_ids)
+
+    chunks = [
+        {
+            "id": chunk_id,
+            "doc_id": rows[chunk_id][1],
+            "filename": rows[chunk_id][2],
+            "section": rows[chunk_id][3],
+            "text": rows[chunk_id][4],
+            "score": score,
+            "matched_by": [
+                name for name, hit in (
+                    ("bm25", chunk_id in lexical_ids),
+                    ("vector", chunk_id in semantic_ids),
+                    ("graph", chunk_id in mentions),
+                ) if hit
+            ],
+            "entities": chunk_entities.get(chunk_id, []),
+        }
+        for chunk_id, score in top if chunk_id in rows
+    ]
+
+    entity_ids = list(dict.fromkeys(seeds + [e for c in chunks for e in c["entities"]]))
+    graph = load_graph(entity_ids)
+    return {"chunks": chunks, "nodes": list(graph.node_dicts()), "edges": list(graph.edge_dicts())}
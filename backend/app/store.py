@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shared on-disk state: every worker process opens the same SQLite database,
+# so caches and stores are visible across workers and survive restarts
+DATA_DIR = os.getenv("AXON_DATA_DIR", "./data")
+DB_PATH = os.path.join(DATA_DIR, "axon.db")
+
+# Bounds for the document and chunking caches: entries older than the TTL are dropped,
+# and beyond the entry cap the oldest go first
+CACHE_TTL_DAYS = float(os.getenv("CACHE_TTL_DAYS", "30"))
+DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "500"))
+CHUNK_CACHE_MAX_ENTRIES = int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", "500"))
+
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns this thread's connection to the shared database, creating it on first use.
+    WAL mode lets readers in other processes proceed while one writer commits.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        _init_schema(conn)
+        _local.conn = conn
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    Write transaction on this thread's connection. BEGIN IMMEDIATE takes the write lock up front,
+    so timestamps taken inside it are ordered like the commits across all workers.
+    """
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _init_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS kv (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS kv_created ON kv (namespace, created_at)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS entity_vectors (
+            id TEXT PRIMARY KEY,
+            label TEXT NOT NULL,
+            type TEXT NOT NULL,
+            description TEXT,
+            text_hash TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS entity_vectors_updated ON entity_vectors (updated_at)")
+
+    # Chunk store + BM25 inverted index (postings and document frequencies)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chunks (
+            id TEXT PRIMARY KEY,
+            doc_id TEXT,
+            filename TEXT,
+            section TEXT,
+            text TEXT NOT NULL,
+            length INTEGER NOT NULL,
+            vector BLOB,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS chunks_updated ON chunks (updated_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS chunks_doc ON chunks (doc_id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_terms (
+            term TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (term, chunk_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS terms (
+            term TEXT PRIMARY KEY,
+            df INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    # Merged knowledge graph, with the chunks each entity was extracted from
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS graph_nodes (
+            id TEXT PRIMARY KEY,
+            label TEXT NOT NULL,
+            type TEXT NOT NULL,
+            properties TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS graph_edges (
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            relationship TEXT NOT NULL,
+            properties TEXT,
+            PRIMARY KEY (source, target, relationship)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS graph_edges_target ON graph_edges (target)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_entities (
+            chunk_id TEXT NOT NULL,
+            entity_id TEXT NOT NULL,
+            PRIMARY KEY (chunk_id, entity_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS chunk_entities_entity ON chunk_entities (entity_id)")
+
+    # Rate-limit token buckets (requests and tokens per minute), shared by all workers
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+            name TEXT PRIMARY KEY,
+            requests REAL NOT NULL,
+            tokens REAL NOT NULL,
+            paused_until REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+
+
+class KVStore:
+    """
+    A namespaced JSON key-value store on top of the shared database.
+    Used for document and result caches that must be shared by all workers.
+    With `max_entries`/`ttl_seconds` it is a bounded cache: expired entries read as missing,
+    and each write evicts expired entries and the oldest ones beyond the cap.
+    """
+
+    def __init__(self, namespace: str, max_entries: int | None = None, ttl_seconds: float | None = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str):
+        row = get_connection().execute(
+            "SELECT value, created_at FROM kv WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        ).fetchone()
+        if row is None or (self.ttl_seconds is not None and row[1] < time.time() - self.ttl_seconds):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value) -> None:
+        now = time.time()
+        row = (self.namespace, key, json.dumps(value), now)
+        insert = "INSERT OR REPLACE INTO kv (namespace, key, value, created_at) VALUES (?, ?, ?, ?)"
+        if self.max_entries is None and self.ttl_seconds is None:
+            # Unbounded stores may be written inside the caller's transaction
+            get_connection().execute(insert, row)
+            return
+
+        with transaction() as conn:
+            conn.execute(insert, row)
+            if self.ttl_seconds is not None:
+                conn.execute(
+                    "DELETE FROM kv WHERE namespace = ? AND created_at < ?",
+                    (self.namespace, now - self.ttl_seconds)
+                )
+            if self.max_entries is not None:
+                conn.execute(
+                    "DELETE FROM kv WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM kv WHERE namespace = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries)
+                )
+
+    def delete(self, key: str) -> None:
+        get_connection().execute(
+            "DELETE FROM kv WHERE namespace = ? AND key = ?",
+            (self.namespace, key)
+        )
+
+
+# Parsed documents, keyed by the SHA-256 of the uploaded PDF
+document_store = KVStore("documents", DOCUMENT_CACHE_MAX_ENTRIES, CACHE_TTL_DAYS * 86400)
+
+# Chunking results, keyed by a hash of the sections being chunked
+chunk_cache = KVStore("chunks", CHUNK_CACHE_MAX_ENTRIES, CACHE_TTL_DAYS * 86400)
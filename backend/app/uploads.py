@@ -0,0 +1,79 @@
+import hashlib
+import os
+import tempfile
+from fastapi import UploadFile, HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Upload limits (enforced before any PDF parsing starts)
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "300"))
+# Limits for /process-pdf, which works through documents in page windows with flat memory use.
+# The upload default matches Streamlit's own upload limit (200 MB).
+PIPELINE_MAX_PAGES = int(os.getenv("PIPELINE_MAX_PAGES", "5000"))
+PIPELINE_MAX_UPLOAD_MB = int(os.getenv("PIPELINE_MAX_UPLOAD_MB", "200"))
+
+# Size of each read from the incoming upload. Peak memory per upload is ~ one chunk.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def check_content_length(content_length: str | None, limit_mb: int = MAX_UPLOAD_MB) -> None:
+    """
+    Rejects a request early based on its Content-Length header, before the body is read.
+    """
+    if content_length and content_length.isdigit() and int(content_length) > limit_mb * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large (limit is {limit_mb} MB)"
+        )
+
+
+async def spool_upload(file: UploadFile, limit_mb: int = MAX_UPLOAD_MB) -> tuple[str, str]:
+    """
+    Streams an upload to a temporary file on disk in fixed-size chunks.
+    Aborts with 413 as soon as the size limit (`limit_mb`) is crossed.
+    Returns (path, sha256) - the caller is responsible for deleting the file.
+    """
+    limit_bytes = limit_mb * 1024 * 1024
+    if file.size is not None and file.size > limit_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large (limit is {limit_mb} MB)"
+        )
+
+    digest = hashlib.sha256()
+    written = 0
+    spool = tempfile.NamedTemporaryFile(prefix="axon-upload-", suffix=".pdf", delete=False)
+    try:
+        with spool:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > limit_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (limit is {limit_mb} MB)"
+                    )
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+
+    if written == 0:
+        os.unlink(spool.name)
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    return spool.name, digest.hexdigest()
+
+
+def check_page_count(page_count: int, limit: int = MAX_PDF_PAGES) -> None:
+    """
+    Rejects documents above the page limit before conversion.
+    """
+    if page_count > limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Document has {page_count} pages (limit is {limit})"
+        )
@@ -0,0 +1,137 @@
+import numpy as np
+
+# Rows converted to float32 at a time during exact search (bounds the temporary copy)
+SEARCH_BLOCK_ROWS = 16384
+# Queries scored at a time during exact search (bounds the queries x rows score matrix)
+QUERY_BLOCK_ROWS = 256
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLES_PER_LIST = 32
+
+
+def normalize(vectors) -> np.ndarray:
+    """L2-normalizes rows as float32 (zero rows stay zero)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class VectorIndex:
+    """
+    In-memory cosine-similarity index.
+    Vectors live in one contiguous float16 matrix with unit-norm rows, so a search is
+    a matrix product followed by a partial sort. After `train()`, an IVF coarse quantizer
+    restricts each query to the rows of its `nprobe` closest centroids.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.matrix = np.zeros((0, dim), dtype=np.float16)
+        self.centroids: np.ndarray | None = None
+        self.assignments: np.ndarray | None = None
+        self.inverted_lists: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: list[str], vectors) -> None:
+        """Inserts or replaces vectors by id"""
+        vectors = normalize(vectors).astype(np.float16)
+        new_ids, new_rows = [], []
+        for item_id, vector in zip(ids, vectors):
+            if item_id in self.positions:
+                position = self.positions[item_id]
+                if position < len(self.ids):
+                    self.matrix[position] = vector
+                else:
+                    new_rows[position - len(self.ids)] = vector
+            else:
+                self.positions[item_id] = len(self.ids) + len(new_rows)
+                new_ids.append(item_id)
+                new_rows.append(vector)
+        if new_rows:
+            self.ids.extend(new_ids)
+            self.matrix = np.vstack([self.matrix, np.asarray(new_rows, dtype=np.float16)])
+        if self.centroids is not None:
+            self._assign()
+
+    def train(self, n_lists: int | None = None, seed: int = 0) -> None:
+        """Fits the IVF coarse quantizer with spherical k-means on a sample of the rows"""
+        n = len(self.ids)
+        n_lists = min(n_lists or max(int(np.sqrt(n)), 1), n)
+        if n_lists == 0:
+            return
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(n, size=min(n, KMEANS_SAMPLES_PER_LIST * n_lists), replace=False)
+        data = self.matrix[np.sort(sample)].astype(np.float32)
+        centroids = data[rng.choice(len(data), size=n_lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            members, starts = np.unique(labels[order], return_index=True)
+            # Centroids that lost all members keep their previous position
+            sums = centroids.copy()
+            sums[members] = np.add.reduceat(data[order], starts, axis=0)
+            centroids = normalize(sums)
+        self.centroids = centroids
+        self._assign()
+
+    def _assign(self) -> None:
+        assignments = np.empty(len(self.ids), dtype=np.int32)
+        for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS):
+            block = self.matrix[start:start + SEARCH_BLOCK_ROWS].astype(np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+        self.assignments = assignments
+        self.inverted_lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def _exact_scores(self, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS):
+            block = self.matrix[start:start + SEARCH_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        k = min(k, scores.shape[-1])
+        top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+        top_scores = np.take_along_axis(scores, top, axis=-1)
+        order = np.argsort(-top_scores, axis=-1)
+        return rows[np.take_along_axis(top, order, axis=-1)], np.take_along_axis(top_scores, order, axis=-1)
+
+    def search(self, queries, k: int = 10, nprobe: int = 8) -> list[list[tuple[str, float]]]:
+        """
+        Batched top-k search. Returns one [(id, score), ...] list per query, best first.
+        Uses the IVF lists when trained, otherwise scans every row.
+        """
+        queries = normalize(queries)
+        if not self.ids or k <= 0:
+            return [[] for _ in queries]
+
+        if self.centroids is None:
+            # Queries in blocks, keeping only each row's top k, so scoring the whole corpus
+            # against itself never materializes an N x N matrix
+            all_rows = np.arange(len(self.ids))
+            results = []
+            for start in range(0, len(queries), QUERY_BLOCK_ROWS):
+                rows, scores = self._top_k(self._exact_scores(queries[start:start + QUERY_BLOCK_ROWS]), all_rows, k)
+                results.extend(
+                    [(self.ids[r], float(s)) for r, s in zip(row, score)]
+                    for row, score in zip(rows, scores)
+                )
+            return results
+
+        results = []
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :nprobe]
+        for query, probe in zip(queries, probes):
+            candidates = np.concatenate([self.inverted_lists[p] for p in probe])
+            if len(candidates) == 0:
+                results.append([])
+                continue
+            scores = self.matrix[candidates].astype(np.float32) @ query
+            rows, top_scores = self._top_k(scores, candidates, k)
+            results.append([(self.ids[r], float(s)) for r, s in zip(rows, top_scores)])
+        return results
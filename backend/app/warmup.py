@@ -0,0 +1,69 @@
+import threading
+import time
+from loguru import logger
+from .chunk_builder import get_semantic_splitter
+from .ontology import MODEL, PROMPT_NAME, get_client, get_langfuse
+
+# Seconds to wait before retrying steps that failed (e.g. provider not reachable yet)
+RETRY_DELAY = 5
+
+
+def _import_pdf_stack():
+    import fitz  # noqa: F401
+    import pymupdf4llm  # noqa: F401
+
+
+def _build_splitter():
+    get_semantic_splitter()
+
+
+def _connect_openai():
+    # A cheap authenticated call: opens the connection pool and validates the key
+    get_client().models.retrieve(MODEL)
+
+
+def _fetch_prompt():
+    get_langfuse().get_prompt(PROMPT_NAME)
+
+
+WARMUP_STEPS = [
+    ("pdf_stack", _import_pdf_stack),
+    ("semantic_splitter", _build_splitter),
+    ("openai", _connect_openai),
+    ("prompt", _fetch_prompt),
+]
+
+# Set on shutdown so a retrying warm-up doesn't keep the process alive
+stop_warmup = threading.Event()
+
+# Shared readiness state, reported by the /ready endpoint
+readiness = {
+    "ready": False,
+    "steps": {name: "pending" for name, _ in WARMUP_STEPS},
+}
+
+
+def run_warmup():
+    """
+    Runs the warm-up steps (heavy imports, clients, prompt fetch) until all succeed.
+    Meant to run in a background thread so the server accepts liveness probes immediately.
+    """
+    pending = list(WARMUP_STEPS)
+    while pending:
+        failed = []
+        for name, step in pending:
+            start = time.perf_counter()
+            try:
+                step()
+                readiness["steps"][name] = "done"
+                logger.info(f"Warm-up step '{name}' done in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                readiness["steps"][name] = f"failed: {e}"
+                logger.warning(f"Warm-up step '{name}' failed: {e}")
+                failed.append((name, step))
+        pending = failed
+        if pending and stop_warmup.wait(RETRY_DELAY):
+            return
+
+    readiness["ready"] = True
+    logger.info("Warm-up complete, backend is ready")
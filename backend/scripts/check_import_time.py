@@ -0,0 +1,43 @@
+"""
+Import-time budget check for the backend.
+Fails if `import app.main` gets slower than the budget, or if any heavy library is imported eagerly.
+Usage (from backend/): python scripts/check_import_time.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+
+# Libraries that must only load during warm-up or on first use
+LAZY_MODULES = ["llama_index", "openai", "langfuse", "fitz", "pymupdf4llm", "pyarrow"]
+
+PROBE = "import sys, app.main; print(' '.join(sys.modules))"
+
+
+def main() -> int:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        check=True,
+        capture_output=True,
+        text=True
+    )
+    elapsed = time.perf_counter() - start
+    loaded = set(result.stdout.split())
+
+    print(f"Backend import took {elapsed:.2f}s (budget {BUDGET_SECONDS:.2f}s)")
+
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    if eager:
+        print(f"Imported eagerly by app.main: {', '.join(eager)}")
+        return 1
+    if elapsed > BUDGET_SECONDS:
+        print("Import-time budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+End-to-end load test: starts the OpenAI/Langfuse stubs (scripts/stub_servers.py) and a backend
+pointed at them, then drives /parse-pdf, /chunk-sections and /extract-chunk at increasing
+concurrency and reports throughput and p50/p95/p99 latency per endpoint and level.
+Usage (from backend/): python scripts/load_test.py [--concurrency 1,2,4,8,16] [--pdf paper.pdf ...]
+Stub options (latency distributions, error rate, recorded responses) are the same as
+stub_servers.py's; see --help.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import httpx
+import numpy as np
+from stub_servers import add_stub_arguments, stub_arguments
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ["parse-pdf", "chunk-sections", "extract-chunk"]
+
+SECTION_TITLES = ["Abstract", "Introduction", "Related Work", "Method", "Experiments", "Results", "Conclusion", "References"]
+VOCABULARY = [
+    "Transformer", "ResNet-50", "BERT", "ImageNet", "COCO", "GLUE", "accuracy", "F1-score", "baseline",
+    "attention", "encoder", "decoder", "dataset", "benchmark", "training", "inference", "latency",
+    "parameters", "LoRA", "GPT-4", "ablation", "convergence", "regularization", "WMT", "BLEU",
+]
+
+
+def synthetic_pdf(pages: int, seed: int) -> bytes:
+    """A paper-shaped PDF: large section headings followed by paragraphs of domain-like text"""
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    sections_per_page = max(len(SECTION_TITLES) // pages, 1)
+    titles = iter(SECTION_TITLES)
+    for _ in range(pages):
+        page = doc.new_page()
+        y = 72
+        for _ in range(sections_per_page):
+            title = next(titles, f"Discussion {rng.randint(1, 99)}")
+            page.insert_text((72, y), title, fontsize=16, fontname="helvetica-bold")
+            y += 24
+            text = " ".join(
+                " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 16))).capitalize() + "."
+                for _ in range(12)
+            )
+            height = 700 // sections_per_page - 40
+            page.insert_textbox(fitz.Rect(72, y, 540, y + height), text, fontsize=10)
+            y += height + 16
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def unique_upload(pdf: bytes) -> bytes:
+    # A trailing PDF comment changes the upload's hash (so the document cache can't serve it)
+    # without changing the document
+    return pdf + f"\n%load-test {uuid.uuid4().hex}\n".encode()
+
+
+class StageResult:
+    def __init__(self, endpoint: str, concurrency: int):
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.latencies: list[float] = []
+        self.statuses: dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def record(self, status: str, latency: float) -> None:
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == "200":
+            self.latencies.append(latency)
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+    @property
+    def errors(self) -> int:
+        return self.requests - len(self.latencies)
+
+    def summary(self) -> dict:
+        p50, p95, p99 = np.percentile(self.latencies, [50, 95, 99]) if self.latencies else (float("nan"),) * 3
+        return {
+            "endpoint": self.endpoint,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "throughput_rps": len(self.latencies) / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "p99_ms": p99 * 1000,
+        }
+
+
+async def run_stage(endpoint: str, concurrency: int, count: int, send) -> tuple[StageResult, list]:
+    """Sends `count` requests (`send(i)` -> response), at most `concurrency` in flight at a time"""
+    result = StageResult(endpoint, concurrency)
+    bodies = []
+    next_index = iter(range(count))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                response = await send(i)
+                status = str(response.status_code)
+                if response.status_code == 200:
+                    bodies.append(response.json())
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            result.record(status, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result, bodies
+
+
+async def run_levels(args, pdfs: list[bytes]) -> list[dict]:
+    summaries = []
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+    async with httpx.AsyncClient(base_url=args.backend_url, timeout=args.timeout, limits=limits) as client:
+        for concurrency in args.concurrency:
+            count = args.requests or max(4 * concurrency, 10)
+            documents: list[dict] = []
+            chunks: list[dict] = []
+
+            async def parse(i):
+                files = {"file": (f"load-{i}.pdf", unique_upload(pdfs[i % len(pdfs)]), "application/pdf")}
+                return await client.post("/parse-pdf", files=files)
+
+            async def chunk(i):
+                document = documents[i % len(documents)]
+                # A fresh filename per request keeps the chunk cache from answering
+                return await client.post("/chunk-sections", json={
+                    "sections": document["sections"],
+                    "filename": f"load-{concurrency}-{i}.pdf",
+                    "doc_id": document["doc_id"],
+                })
+
+            async def extract(i):
+                return await client.post("/extract-chunk", json={"chunk": chunks[i % len(chunks)]})
+
+            for endpoint, send in zip(ENDPOINTS, [parse, chunk, extract]):
+                if endpoint not in args.endpoints:
+                    continue
+                # When an earlier stage isn't measured, one unmeasured request provides its output
+                if endpoint != "parse-pdf" and not documents:
+                    documents.extend((await run_stage("parse-pdf", 1, 1, parse))[1])
+                if endpoint == "extract-chunk" and documents and not chunks:
+                    chunks.extend(c for body in (await run_stage("chunk-sections", 1, 1, chunk))[1] for c in body["chunks"])
+                if endpoint != "parse-pdf" and not (documents and (endpoint == "chunk-sections" or chunks)):
+                    print(f"Skipping {endpoint}: the previous stage produced nothing to send", file=sys.stderr)
+                    continue
+
+                result, bodies = await run_stage(endpoint, concurrency, count, send)
+                if endpoint == "parse-pdf":
+                    documents.extend(bodies)
+                elif endpoint == "chunk-sections":
+                    chunks.extend(c for body in bodies for c in body["chunks"])
+                summary = result.summary()
+                summaries.append(summary)
+                print_row(summary)
+    return summaries
+
+
+def print_header() -> None:
+    print(f"{'endpoint':<16}{'conc':>6}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+
+def print_row(summary: dict) -> None:
+    print(
+        f"{summary['endpoint']:<16}{summary['concurrency']:>6}{summary['requests']:>7}{summary['errors']:>8}"
+        f"{summary['throughput_rps']:>9.2f}{summary['p50_ms']:>10.0f}{summary['p95_ms']:>10.0f}{summary['p99_ms']:>10.0f}",
+        flush=True
+    )
+
+
+def wait_until(url: str, timeout: float, process: subprocess.Popen | None = None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Process exited with status {process.returncode} before {url} came up")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def start_processes(args, workdir: str) -> list[subprocess.Popen]:
+    """Starts the stubs and a backend configured against them (with its own, empty data dir)"""
+    processes = []
+    stub_log = open(os.path.join(workdir, "stubs.log"), "w")
+    stubs = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "scripts", "stub_servers.py"), *stub_arguments(args)],
+        stdout=stub_log, stderr=subprocess.STDOUT
+    )
+    processes.append(stubs)
+    wait_until(f"http://127.0.0.1:{args.openai_port}/stats", 30, stubs)
+    wait_until(f"http://127.0.0.1:{args.langfuse_port}/stats", 30, stubs)
+
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "stub-key",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.openai_port}/v1",
+        "LANGFUSE_BASE_URL": f"http://127.0.0.1:{args.langfuse_port}",
+        "LANGFUSE_PUBLIC_KEY": "pk-stub",
+        "LANGFUSE_SECRET_KEY": "sk-stub",
+        "AXON_DATA_DIR": os.path.join(workdir, "data"),
+    }
+    port = args.backend_url.rsplit(":", 1)[-1].rstrip("/")
+    backend_log = open(os.path.join(workdir, "backend.log"), "w")
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", port, "--workers", str(args.workers)],
+        cwd=BACKEND_DIR, env=env, stdout=backend_log, stderr=subprocess.STDOUT
+    )
+    processes.append(backend)
+    wait_until(f"{args.backend_url}/ready", 120, backend)
+    return processes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per endpoint and level (default 4x concurrency, at least 10)")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Endpoints to drive")
+    parser.add_argument("--pdf", action="append", default=[], help="Sample PDF (repeatable); synthetic papers by default")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per synthetic paper")
+    parser.add_argument("--backend-url", default="http://127.0.0.1:8765")
+    parser.add_argument("--external", action="store_true", help="Drive an already running backend (and stubs) at --backend-url")
+    parser.add_argument("--workers", type=int, default=1, help="Backend worker processes")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.endpoints = args.endpoints.split(",")
+
+    pdfs = []
+    for path in args.pdf:
+        with open(path, "rb") as f:
+            pdfs.append(f.read())
+    if not pdfs:
+        pdfs = [synthetic_pdf(args.pages, seed) for seed in range(4)]
+
+    workdir = tempfile.mkdtemp(prefix="axon-load-")
+    processes = [] if args.external else start_processes(args, workdir)
+    try:
+        print_header()
+        summaries = asyncio.run(run_levels(args, pdfs))
+        if not args.external:
+            upstream = {
+                "openai": httpx.get(f"http://127.0.0.1:{args.openai_port}/stats").json(),
+                "langfuse": httpx.get(f"http://127.0.0.1:{args.langfuse_port}/stats").json(),
+            }
+            print(f"Upstream calls: {json.dumps(upstream)}")
+            print(f"Logs in {workdir}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=60)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"levels": summaries}, f, indent=2)
+    return 1 if any(s["errors"] == s["requests"] for s in summaries) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
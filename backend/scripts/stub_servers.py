@@ -0,0 +1,409 @@
+"""
+Local stand-ins for the OpenAI API (chat completions, embeddings, models) and the Langfuse
+prompt API, so load tests cost nothing and don't swing with provider latency.
+Latency, error rate, quota and the returned extractions are configurable.
+Usage (from backend/): python scripts/stub_servers.py [--chat-latency lognormal:3:0.4] [--error-rate 0.02]
+Point the backend at them with OPENAI_BASE_URL=http://127.0.0.1:8910/v1 and
+LANGFUSE_BASE_URL=http://127.0.0.1:8911
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import random
+import re
+import time
+import uuid
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_OPENAI_PORT = 8910
+DEFAULT_LANGFUSE_PORT = 8911
+
+# Default embedding sizes, used when a request doesn't ask for `dimensions`
+EMBEDDING_DIMENSIONS = {"text-embedding-3-large": 3072, "text-embedding-3-small": 1536}
+
+DEFAULT_PROMPT = (
+    "Extract the entities and relations from this excerpt of the {{section}} section "
+    "of a research paper.\n\n{{chunk_text}}"
+)
+
+# Share of a streamed completion's latency spent before the first token
+STREAM_FIRST_TOKEN_SHARE = 0.25
+STREAM_PIECE_CHARS = 24
+
+# Synthetic extractions use a few valid ontology values
+ENTITY_TYPES = ["method", "dataset", "metric", "concept"]
+RELATION_TYPES = ["USES", "EVALUATES_ON", "COMPARES_TO", "EXTENDS"]
+CANDIDATE_NAME = re.compile(r"\b[A-Z][A-Za-z0-9-]{2,}\b")
+
+
+class Latency:
+    """
+    Response delay in seconds, sampled from a distribution written as "kind:params":
+    constant:0.5, uniform:0.2:1.5, lognormal:2.0:0.5 (median, sigma), exponential:1.0 (mean)
+    """
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params]
+        expected = {"constant": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+        if kind not in expected or len(values) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        self.spec = spec
+        self.kind = kind
+        self.params = values
+
+    def sample(self) -> float:
+        if self.kind == "constant":
+            return self.params[0]
+        if self.kind == "uniform":
+            return random.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * random.lognormvariate(0, sigma)
+        return random.expovariate(1 / self.params[0])
+
+
+class StubConfig:
+    def __init__(
+        self,
+        chat_latency: str = "lognormal:3:0.4",
+        embed_latency: str = "lognormal:0.15:0.3",
+        prompt_latency: str = "constant:0.05",
+        error_rate: float = 0.0,
+        error_statuses: tuple[int, ...] = (429, 500, 503),
+        retry_after: float = 1.0,
+        responses: list[str] | None = None,
+        prompt: str = DEFAULT_PROMPT,
+        max_entities: int = 8,
+        rpm: float = 0,
+        tpm: float = 0,
+    ):
+        self.chat_latency = Latency(chat_latency)
+        self.embed_latency = Latency(embed_latency)
+        self.prompt_latency = Latency(prompt_latency)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.retry_after = retry_after
+        self.prompt = prompt
+        self.max_entities = max_entities
+        self.quota = Quota(rpm, tpm)
+        # Recorded responses are replayed in order; without them, extractions are synthesized
+        self._responses = itertools.cycle(responses) if responses else None
+
+    def next_response(self, prompt: str) -> str:
+        if self._responses is not None:
+            return next(self._responses)
+        return json.dumps(synthetic_extraction(prompt, self.max_entities))
+
+    def injected_error(self) -> JSONResponse | None:
+        if random.random() >= self.error_rate:
+            return None
+        status = random.choice(self.error_statuses)
+        headers = {"retry-after-ms": str(int(self.retry_after * 1000))} if status == 429 else None
+        error = {"message": f"Injected stub error ({status})", "type": "stub_error", "code": str(status)}
+        return JSONResponse(status_code=status, content={"error": error}, headers=headers)
+
+
+class Quota:
+    """Provider-side rate limit (0 = unlimited): one-minute token buckets for requests and tokens"""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = rpm
+        self.tokens = tpm
+        self.updated = time.monotonic()
+
+    def exceeded(self, tokens: int) -> JSONResponse | None:
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        if (self.rpm and self.requests < 1) or (self.tpm and self.tokens < tokens):
+            wait = max((1 - self.requests) * 60 / self.rpm if self.rpm else 0, (tokens - self.tokens) * 60 / self.tpm if self.tpm else 0)
+            error = {"message": "Rate limit reached (stub quota)", "type": "requests", "code": "rate_limit_exceeded"}
+            return JSONResponse(status_code=429, content={"error": error}, headers={"retry-after-ms": str(int(wait * 1000) + 1)})
+        self.requests -= 1
+        self.tokens -= tokens
+        return None
+
+
+def load_responses(path: str) -> list[str]:
+    """Recorded completions: a JSON list, or JSON lines, of extraction objects (or raw content strings)"""
+    with open(path) as f:
+        text = f.read()
+    try:
+        records = json.loads(text)
+        if not isinstance(records, list):
+            records = [records]
+    except json.JSONDecodeError:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [r if isinstance(r, str) else json.dumps(r) for r in records]
+
+
+def synthetic_extraction(prompt: str, max_entities: int) -> dict:
+    """A valid extraction built from the capitalized names in the prompt, linked in a chain"""
+    names = list(dict.fromkeys(CANDIDATE_NAME.findall(prompt)))[:max_entities]
+    entities = []
+    for name in names:
+        code = int(hashlib.md5(name.encode()).hexdigest(), 16)
+        entities.append({
+            "id": name.lower().replace("-", "_"),
+            "label": name,
+            "type": ENTITY_TYPES[code % len(ENTITY_TYPES)],
+            "properties": {"section": None, "canonical_name": name, "aliases": [], "description": f"Mentions {name}"},
+        })
+    relations = [
+        {
+            "source": source["id"],
+            "target": target["id"],
+            "relationship": RELATION_TYPES[i % len(RELATION_TYPES)],
+            "properties": {
+                "confidence": "medium",
+                "context": f"{source['label']} and {target['label']}",
+                "section": None,
+                "quantitative_detail": None,
+            },
+        }
+        for i, (source, target) in enumerate(zip(entities, entities[1:]))
+    ]
+    return {"entities": entities, "relations": relations}
+
+
+def _token_estimate(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def _embedding(text: str, dimensions: int) -> np.ndarray:
+    # Deterministic per text, so repeated texts embed identically (as they would upstream)
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def create_openai_stub(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    stats = {"chat": 0, "chat_stream": 0, "embeddings": 0, "embedded_inputs": 0, "errors": 0, "rate_limited": 0}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.get("/v1/models/{model}")
+    async def retrieve_model(model: str):
+        return {"id": model, "object": "model", "created": 0, "owned_by": "stub"}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.embed_latency.sample())
+        stats["embeddings"] += 1
+        if error := config.injected_error():
+            stats["errors"] += 1
+            return error
+
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+        stats["embedded_inputs"] += len(texts)
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS.get(body.get("model"), 1536)
+        base64_encoded = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(texts):
+            vector = _embedding(text, dimensions)
+            encoded = base64.b64encode(vector.tobytes()).decode() if base64_encoded else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": encoded})
+        tokens = sum(_token_estimate(text) for text in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        latency = config.chat_latency.sample()
+        stream = body.get("stream", False)
+        stats["chat_stream" if stream else "chat"] += 1
+
+        if error := config.injected_error():
+            # Failures tend to come back quicker than full completions
+            await asyncio.sleep(latency * 0.1)
+            stats["errors"] += 1
+            return error
+
+        content = config.next_response(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "stub")
+        usage = {
+            "prompt_tokens": _token_estimate(prompt),
+            "completion_tokens": _token_estimate(content),
+            "total_tokens": _token_estimate(prompt) + _token_estimate(content),
+        }
+        if limited := config.quota.exceeded(usage["total_tokens"]):
+            stats["rate_limited"] += 1
+            return limited
+
+        if not stream:
+            await asyncio.sleep(latency)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": None},
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        pieces = [content[i:i + STREAM_PIECE_CHARS] for i in range(0, len(content), STREAM_PIECE_CHARS)]
+
+        def event(delta: dict, finish_reason: str | None = None, **extra) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        async def events():
+            await asyncio.sleep(latency * STREAM_FIRST_TOKEN_SHARE)
+            yield event({"role": "assistant", "content": "", "refusal": None})
+            piece_delay = latency * (1 - STREAM_FIRST_TOKEN_SHARE) / max(len(pieces), 1)
+            for piece in pieces:
+                await asyncio.sleep(piece_delay)
+                yield event({"content": piece})
+            yield event({}, "stop")
+            if include_usage:
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def create_langfuse_stub(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="Langfuse stub")
+    stats = {"prompts": 0}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.get("/api/public/v2/prompts/{name}")
+    async def get_prompt(name: str):
+        await asyncio.sleep(config.prompt_latency.sample())
+        stats["prompts"] += 1
+        return {
+            "name": name,
+            "version": 1,
+            "type": "text",
+            "prompt": config.prompt,
+            "config": {},
+            "labels": ["production"],
+            "tags": [],
+        }
+
+    @app.post("/api/public/ingestion")
+    async def ingestion():
+        # Traces are accepted and dropped
+        return JSONResponse(status_code=207, content={"successes": [], "errors": []})
+
+    return app
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("stubs")
+    group.add_argument("--openai-port", type=int, default=DEFAULT_OPENAI_PORT)
+    group.add_argument("--langfuse-port", type=int, default=DEFAULT_LANGFUSE_PORT)
+    group.add_argument("--chat-latency", default="lognormal:3:0.4", help="Chat completion latency distribution")
+    group.add_argument("--embed-latency", default="lognormal:0.15:0.3", help="Embeddings latency distribution")
+    group.add_argument("--prompt-latency", default="constant:0.05", help="Langfuse prompt fetch latency distribution")
+    group.add_argument("--error-rate", type=float, default=0.0, help="Share of OpenAI calls that fail")
+    group.add_argument("--error-statuses", default="429,500,503", help="Statuses the injected errors use")
+    group.add_argument("--chat-rpm", type=float, default=0, help="Chat requests per minute before 429s (0 = unlimited)")
+    group.add_argument("--chat-tpm", type=float, default=0, help="Chat tokens per minute before 429s (0 = unlimited)")
+    group.add_argument("--retry-after", type=float, default=1.0, help="Retry hint (seconds) sent with 429s")
+    group.add_argument("--responses", help="Recorded extractions to replay (JSON list or JSON lines)")
+    group.add_argument("--prompt-file", help="Prompt template to serve instead of the built-in one")
+
+
+def stub_arguments(args: argparse.Namespace) -> list[str]:
+    """The parsed stub options as command-line arguments (to start the stubs in another process)"""
+    argv = [
+        "--openai-port", str(args.openai_port),
+        "--langfuse-port", str(args.langfuse_port),
+        "--chat-latency", args.chat_latency,
+        "--embed-latency", args.embed_latency,
+        "--prompt-latency", args.prompt_latency,
+        "--error-rate", str(args.error_rate),
+        "--error-statuses", args.error_statuses,
+        "--chat-rpm", str(args.chat_rpm),
+        "--chat-tpm", str(args.chat_tpm),
+        "--retry-after", str(args.retry_after),
+    ]
+    if args.responses:
+        argv += ["--responses", args.responses]
+    if args.prompt_file:
+        argv += ["--prompt-file", args.prompt_file]
+    return argv
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    prompt = DEFAULT_PROMPT
+    if args.prompt_file:
+        with open(args.prompt_file) as f:
+            prompt = f.read()
+    return StubConfig(
+        chat_latency=args.chat_latency,
+        embed_latency=args.embed_latency,
+        prompt_latency=args.prompt_latency,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_statuses.split(",")),
+        retry_after=args.retry_after,
+        rpm=args.chat_rpm,
+        tpm=args.chat_tpm,
+        responses=load_responses(args.responses) if args.responses else None,
+        prompt=prompt,
+    )
+
+
+async def serve(config: StubConfig, openai_port: int, langfuse_port: int) -> None:
+    servers = [
+        uvicorn.Server(uvicorn.Config(create_openai_stub(config), host="127.0.0.1", port=openai_port, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(create_langfuse_stub(config), host="127.0.0.1", port=langfuse_port, log_level="warning")),
+    ]
+    print(f"OpenAI stub on http://127.0.0.1:{openai_port}/v1, Langfuse stub on http://127.0.0.1:{langfuse_port}", flush=True)
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(serve(config_from_args(args), args.openai_port, args.langfuse_port))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import time
+
+from app.executor import iterate_blocking
+
+
+def slow_items(closed: threading.Event, started: threading.Event):
+    try:
+        yield 1
+        started.set()
+        time.sleep(0.3)
+        yield 2
+    finally:
+        closed.set()
+
+
+def test_cancelled_consumer_closes_iterator_after_pending_next():
+    closed, started = threading.Event(), threading.Event()
+    items = slow_items(closed, started)
+    received = []
+
+    async def consume():
+        async for item in iterate_blocking(items):
+            received.append(item)
+
+    async def main():
+        task = asyncio.create_task(consume())
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    assert received == [1]
+    assert closed.is_set()
+    # close() ran: the generator finished instead of being left suspended for the GC
+    assert items.gi_frame is None
+
+
+def test_iterates_to_the_end():
+    closed, started = threading.Event(), threading.Event()
+
+    async def collect():
+        return [item async for item in iterate_blocking(slow_items(closed, started))]
+
+    assert asyncio.run(collect()) == [1, 2]
+    assert closed.is_set()
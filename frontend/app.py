@@ -1,7 +1,11 @@
 import streamlit as st
 import os
+import json
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from streamlit_agraph import agraph, Node, Edge, Config
+from http_client import HTTP_RETRIES, check_response, make_http_session, short_retry_after
 
 st.set_page_config(
     page_title="Axon",
@@ -280,6 +284,16 @@ st.markdown("""
 
 API_URL = os.getenv("API_URL","http://localhost:8000")
 
+# Number of chunks extracted in parallel (also the size of the HTTP connection pool)
+EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "8"))
+# A preview graph is shown once this many of the highest-priority chunks are extracted
+PREVIEW_CHUNKS = int(os.getenv("PREVIEW_CHUNKS", "8"))
+# Above this many entities, low-degree ones are collapsed into one node per type
+MAX_RENDERED_NODES = int(os.getenv("MAX_RENDERED_NODES", "300"))
+# Uploads from this size on default to large-document mode: the backend processes them in page windows
+# and the session keeps only a bounded view of the graph
+LARGE_PDF_MB = float(os.getenv("LARGE_PDF_MB", "10"))
+
 NODE_COLORS = {
     "method":      "#3A86FF",
     "metric":      "#00B4D8",
@@ -290,45 +304,179 @@ NODE_COLORS = {
     "problem":     "#D00000",
 }
 
+@st.cache_resource
+def get_http_session():
+    """One keep-alive session shared by all requests and extraction threads"""
+    return make_http_session(EXTRACT_CONCURRENCY)
+
 def parse_pdf(pdf_file):
     file_payload = {"file": (pdf_file.name, pdf_file.read(), "application/pdf")}
-    response = requests.post(f"{API_URL}/parse-pdf", files=file_payload, timeout=120)
-    response.raise_for_status()
+    response = get_http_session().post(f"{API_URL}/parse-pdf", files=file_payload, timeout=120)
+    check_response(response)
     return response.json()
 
-def chunk_sections(sections, filename):
-    payload = {"sections": sections, "filename": filename}
-    response = requests.post(f"{API_URL}/chunk-sections", json=payload, timeout=120)
+def process_pdf(pdf_file):
+    """Large-document mode: yields the backend's progress events while it processes the PDF in page windows"""
+    file_payload = {"file": (pdf_file.name, pdf_file, "application/pdf")}
+    with get_http_session().post(f"{API_URL}/process-pdf", files=file_payload, stream=True, timeout=120) as response:
+        check_response(response)
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+def fetch_document_graph(doc_id):
+    """The document's most mentioned entities and the relations among them, from the backend's graph store"""
+    params = {"max_nodes": MAX_RENDERED_NODES}
+    response = get_http_session().get(f"{API_URL}/graph/document/{doc_id}", params=params, timeout=60)
     response.raise_for_status()
     return response.json()
 
+def chunk_sections(sections, filename, doc_id=None):
+    payload = {"sections": sections, "filename": filename, "doc_id": doc_id}
+    response = get_http_session().post(f"{API_URL}/chunk-sections", json=payload, timeout=120)
+    check_response(response)
+    return response.json()
+
 def extract_chunk(chunk):
     payload = {"chunk": chunk}
-    response = requests.post(f"{API_URL}/extract-chunk", json=payload, timeout=60)
+    for attempt in range(HTTP_RETRIES + 1):
+        response = get_http_session().post(f"{API_URL}/extract-chunk", json=payload, timeout=60)
+        retry_after = short_retry_after(response)
+        if retry_after is None or attempt == HTTP_RETRIES:
+            break
+        time.sleep(retry_after)
+    check_response(response)
+    return response.json()
+
+def extract_chunks_concurrently(chunks, on_progress, on_preview=None):
+    """
+    Extracts chunks on a bounded thread pool and merges results in completion order.
+    Chunks are dispatched by the backend's priority (Abstract, Method, Results... first, References last);
+    once the top PREVIEW_CHUNKS of them are done, on_preview(nodes, edges) gets the graph so far.
+    Each chunk is retried on its own; a chunk that still fails is skipped, not the whole run.
+    Returns (nodes, edges, failed_count).
+    """
+    all_nodes = {}
+    all_edges = []
+    seen_edges = set()
+    failed = 0
+
+    ordered = sorted(chunks, key=lambda chunk: -chunk.get("priority", 0))
+    preview_at = min(PREVIEW_CHUNKS, len(ordered))
+    top_remaining = preview_at
+
+    with ThreadPoolExecutor(max_workers=EXTRACT_CONCURRENCY) as pool:
+        # The pool runs submissions in order, so dispatch follows priority
+        futures = {pool.submit(extract_chunk, chunk): rank for rank, chunk in enumerate(ordered)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except requests.RequestException:
+                failed += 1
+                result = {}
+
+            for node in result.get("nodes", []):
+                if node["id"] not in all_nodes:
+                    all_nodes[node["id"]] = node
+
+            for edge in result.get("edges", []):
+                key = (edge["source"], edge["target"], edge["relationship"])
+                if key not in seen_edges:
+                    seen_edges.add(key)
+                    all_edges.append(edge)
+
+            on_progress(done, len(chunks))
+
+            if futures[future] < preview_at:
+                top_remaining -= 1
+                if top_remaining == 0 and on_preview and done < len(chunks) and all_nodes:
+                    on_preview(list(all_nodes.values()), list(all_edges))
+
+    return list(all_nodes.values()), all_edges, failed
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def fetch_graph_layout(nodes, edges, expand, groups=None):
+    """Server-side level of detail + coordinates, so the browser doesn't run the physics simulation"""
+    payload = {
+        "nodes": nodes,
+        "edges": edges,
+        "max_nodes": MAX_RENDERED_NODES,
+        "expand": list(expand),
+        "groups": groups,
+    }
+    response = get_http_session().post(f"{API_URL}/graph/layout", json=payload, timeout=60)
     response.raise_for_status()
     return response.json()
 
-def build_agraph_nodes(nodes_data):
+def analyze_graph(nodes, edges):
+    payload = {"nodes": nodes, "edges": edges}
+    response = get_http_session().post(f"{API_URL}/graph/analyze", json=payload, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+def index_entities(nodes):
+    response = get_http_session().post(f"{API_URL}/entities/index", json={"nodes": nodes}, timeout=120)
+    response.raise_for_status()
+    return response.json()
+
+def get_merge_suggestions(ids):
+    response = get_http_session().post(f"{API_URL}/entities/merge-suggestions", json={"ids": ids}, timeout=60)
+    response.raise_for_status()
+    return response.json()["suggestions"]
+
+@st.cache_data(show_spinner=False, ttl=300)
+def search_entities(query, k=10):
+    response = get_http_session().get(f"{API_URL}/entities/search", params={"q": query, "k": k}, timeout=30)
+    response.raise_for_status()
+    return response.json()["results"]
+
+@st.cache_data(show_spinner=False, ttl=300)
+def query_corpus(question, k=5):
+    response = get_http_session().post(f"{API_URL}/query", json={"question": question, "k": k}, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+def get_community_names(analysis):
+    """Readable names for level-0 communities, e.g. 'C3 · Transformer, BLEU, WMT'"""
+    return {
+        c["id"]: f"C{c['id'].split('-')[1]} · {c['label']}"
+        for c in analysis["communities"] if c["level"] == 0
+    }
+
+def build_agraph_nodes(nodes_data, pagerank=None):
     nodes = []
+    max_rank = max(pagerank.values(), default=0) if pagerank else 0
     for node in nodes_data:
         color = NODE_COLORS.get(node.get("type", ""), "#888888")
+        is_aggregate = node.get("aggregate", False)
+        if is_aggregate:
+            size = min(25 + 3 * node.get("count", 1) ** 0.5, 60)
+        elif max_rank:
+            # More central entities are drawn bigger
+            size = 15 + 25 * (pagerank.get(node["id"], 0) / max_rank) ** 0.5
+        else:
+            size = 25
         nodes.append(Node(
             id=node["id"],
             label=node["label"],
-            size=25,
+            size=size,
             color=color,
+            shape="diamond" if is_aggregate else "dot",
+            x=node.get("x"),
+            y=node.get("y"),
             font={"color": "#ffffff", "size": 14, "strokeWidth": 2, "strokeColor": "#000000"},
-            title=f"{node['type'].upper()}\n{node.get('properties', {}).get('description', '') or ''}"
+            title=f"{node['type'].upper()}\n{(node.get('properties') or {}).get('description', '') or ''}"
         ))
     return nodes
 
 def build_agraph_edges(edges_data):
     edges = []
     for edge in edges_data:
+        count = edge.get("count", 1)
         edges.append(Edge(
             source=edge["source"],
             target=edge["target"],
-            label=edge["relationship"],
+            label=f"{edge['relationship']} ×{count}" if count > 1 else edge["relationship"],
             color="#9ca3af",
             font={"color": "#22c55e", "size": 6, "strokeWidth": 1, "strokeColor": "#14532d"}
         ))
@@ -339,7 +487,7 @@ def get_graph_config():
         width="100%",
         height=700,
         directed=True,
-        physics=True,
+        physics=False,  # coordinates come precomputed from /graph/layout
         hierarchical=False,
         nodeHighlightBehavior=True,
         highlightColor="#00d4ff",
@@ -367,6 +515,63 @@ def get_graph_config():
         }
     )
 
+def get_window_progress_html(pages_done, page_count, extracted, chunk_total):
+    pct = int((extracted / chunk_total) * pages_done / page_count * 100) if chunk_total and page_count else 0
+    return f'''<div class="preview-box">
+        <div class="preview-label">📚 Processing in page windows</div>
+        <div style="background: rgba(255,255,255,0.1); border-radius: 4px; height: 8px; margin: 0.5rem 0;">
+            <div style="background: linear-gradient(90deg, #7b2cbf, #00d4ff); width: {pct}%; height: 100%; border-radius: 4px; transition: width 0.3s;"></div>
+        </div>
+        <div style="color: rgba(255,255,255,0.5); font-size: 0.8rem;">Chunked {pages_done} of {page_count} pages • Extracted {extracted} of {chunk_total} chunks</div>
+    </div>'''
+
+def process_large_document(pdf_file, progress_container, status_container, preview_container):
+    """
+    Large-document mode: the backend converts, chunks and extracts the PDF in page windows and keeps
+    the graph in its store; only the document's most mentioned entities are fetched for display.
+    Returns (nodes, edges, chunk_count, section_count, whole-document totals).
+    """
+    phase_results = {}
+    progress_container.markdown(get_phase_html("parse", phase_results), unsafe_allow_html=True)
+    status_container.info("📚 Processing the document in page windows...")
+
+    pages_done = page_count = chunk_total = extracted = 0
+    done = None
+    pdf_file.seek(0)
+    for event in process_pdf(pdf_file):
+        if event["type"] == "window":
+            chunk_total += event["chunks"]
+            pages_done = event.get("last_page", pages_done)
+            page_count = event.get("page_count", page_count)
+        elif event["type"] == "chunk":
+            extracted += 1
+        elif event["type"] == "error":
+            raise RuntimeError(event["detail"])
+        else:
+            done = event
+        if pages_done and pages_done == page_count and not phase_results:
+            phase_results.update(parse=True, chunk=True)
+            progress_container.markdown(get_phase_html("extract", phase_results), unsafe_allow_html=True)
+        preview_container.markdown(
+            get_window_progress_html(pages_done, page_count, extracted, chunk_total), unsafe_allow_html=True
+        )
+    if done is None:
+        raise RuntimeError("Processing ended before the document was complete")
+
+    phase_results.update(parse=True, chunk=True, extract=True)
+    progress_container.markdown(get_phase_html(None, phase_results), unsafe_allow_html=True)
+    if done["failed_chunks"]:
+        status_container.warning(
+            f"⚠️ Extraction complete, but {done['failed_chunks']} of {done['chunk_count']} chunks failed and were skipped"
+        )
+    else:
+        status_container.success(f"✓ Knowledge graph extracted from {done['page_count']} pages!")
+    preview_container.empty()
+
+    graph = fetch_document_graph(done["doc_id"])
+    totals = {"node_count": done["node_count"], "edge_count": done["edge_count"]}
+    return graph["nodes"], graph["edges"], done["chunk_count"], done["section_count"], totals
+
 def get_phase_html(current_phase, phase_results):
     phases = [
         ("📄", "Parsing PDF", "parse"),
@@ -414,7 +619,7 @@ def get_extraction_progress_html(current, total):
         <div style="background: rgba(255,255,255,0.1); border-radius: 4px; height: 8px; margin: 0.5rem 0;">
             <div style="background: linear-gradient(90deg, #7b2cbf, #00d4ff); width: {pct}%; height: 100%; border-radius: 4px; transition: width 0.3s;"></div>
         </div>
-        <div style="color: rgba(255,255,255,0.5); font-size: 0.8rem;">Processing chunk {current} of {total}</div>
+        <div style="color: rgba(255,255,255,0.5); font-size: 0.8rem;">Extracted {current} of {total} chunks</div>
     </div>'''
 
 st.markdown('<h1 class="main-header"> Axon </h1>', unsafe_allow_html=True)
@@ -528,76 +733,108 @@ if uploaded_file is not None:
     </div>
     """, unsafe_allow_html=True)
     
+    large_document = st.checkbox(
+        "📚 Large document mode",
+        value=uploaded_file.size >= LARGE_PDF_MB * 1024 * 1024,
+        help="Processes the PDF in windows of pages on the server (for documents of hundreds of pages) "
+             "and shows its most mentioned entities"
+    )
+    
     if st.button("🧠 Extract Knowledge Graph", use_container_width=True):
         phase_results = {}
         progress_container = st.empty()
         status_container = st.empty()
         preview_container = st.empty()
+        graph_preview_container = st.empty()
         
         try:
-            # Phase 1: Parse PDF
-            progress_container.markdown(get_phase_html("parse", phase_results), unsafe_allow_html=True)
-            status_container.info("📄 Parsing PDF and extracting sections...")
+            if large_document:
+                nodes_data, edges_data, chunk_count, section_count, graph_totals = process_large_document(
+                    uploaded_file, progress_container, status_container, preview_container
+                )
+            else:
+                # Phase 1: Parse PDF
+                progress_container.markdown(get_phase_html("parse", phase_results), unsafe_allow_html=True)
+                status_container.info("📄 Parsing PDF and extracting sections...")
             
-            uploaded_file.seek(0)
-            parse_result = parse_pdf(uploaded_file)
-            phase_results["parse"] = parse_result
+                uploaded_file.seek(0)
+                parse_result = parse_pdf(uploaded_file)
+                phase_results["parse"] = parse_result
             
-            progress_container.markdown(get_phase_html("chunk", phase_results), unsafe_allow_html=True)
-            status_container.success(f"✓ Parsed PDF: {parse_result['section_count']} sections found")
-            preview_container.markdown(get_sections_preview_html(parse_result["sections"]), unsafe_allow_html=True)
+                progress_container.markdown(get_phase_html("chunk", phase_results), unsafe_allow_html=True)
+                status_container.success(f"✓ Parsed PDF: {parse_result['section_count']} sections found")
+                preview_container.markdown(get_sections_preview_html(parse_result["sections"]), unsafe_allow_html=True)
             
-            # Phase 2: Chunk Sections
-            status_container.info("✂️ Creating semantic chunks from sections...")
+                # Phase 2: Chunk Sections
+                status_container.info("✂️ Creating semantic chunks from sections...")
             
-            chunk_result = chunk_sections(parse_result["sections"], uploaded_file.name)
-            phase_results["chunk"] = chunk_result
+                chunk_result = chunk_sections(parse_result["sections"], uploaded_file.name, parse_result.get("doc_id"))
+                phase_results["chunk"] = chunk_result
             
-            progress_container.markdown(get_phase_html("extract", phase_results), unsafe_allow_html=True)
-            status_container.success(f"✓ Created {chunk_result['chunk_count']} semantic chunks")
-            preview_container.markdown(get_chunks_preview_html(chunk_result["chunks"]), unsafe_allow_html=True)
+                progress_container.markdown(get_phase_html("extract", phase_results), unsafe_allow_html=True)
+                status_container.success(f"✓ Created {chunk_result['chunk_count']} semantic chunks")
+                preview_container.markdown(get_chunks_preview_html(chunk_result["chunks"]), unsafe_allow_html=True)
             
-            # Phase 3: Extract Graph (chunk by chunk with progress)
-            status_container.info("🧠 Extracting knowledge graph from chunks...")
+                # Phase 3: Extract Graph (chunks in parallel, progress as they complete)
+                status_container.info("🧠 Extracting knowledge graph from chunks...")
             
-            all_nodes = {}
-            all_edges = []
-            chunks = chunk_result["chunks"]
-            total_chunks = len(chunks)
+                chunks = chunk_result["chunks"]
+                total_chunks = len(chunks)
             
-            for i, chunk in enumerate(chunks):
-                preview_container.markdown(get_extraction_progress_html(i + 1, total_chunks), unsafe_allow_html=True)
-                
-                result = extract_chunk(chunk)
-                
-                for node in result.get("nodes", []):
-                    if node["id"] not in all_nodes:
-                        all_nodes[node["id"]] = node
-                
-                for edge in result.get("edges", []):
-                    is_duplicate = any(
-                        e["source"] == edge["source"] and 
-                        e["target"] == edge["target"] and 
-                        e["relationship"] == edge["relationship"]
-                        for e in all_edges
-                    )
-                    if not is_duplicate:
-                        all_edges.append(edge)
+                def show_preview(nodes, edges):
+                    with graph_preview_container.container():
+                        st.markdown("### 👀 Preview")
+                        st.caption(
+                            f"Graph from the {min(PREVIEW_CHUNKS, total_chunks)} most informative chunks "
+                            f"({len(nodes)} entities); the remaining chunks are still being extracted."
+                        )
+                        try:
+                            layout = fetch_graph_layout(nodes, edges, ())
+                            agraph(
+                                nodes=build_agraph_nodes(layout["nodes"]),
+                                edges=build_agraph_edges(layout["edges"]),
+                                config=get_graph_config()
+                            )
+                        except requests.RequestException:
+                            st.caption("Preview unavailable")
+            
+                nodes_data, edges_data, failed_chunks = extract_chunks_concurrently(
+                    chunks,
+                    on_progress=lambda done, total: preview_container.markdown(
+                        get_extraction_progress_html(done, total), unsafe_allow_html=True
+                    ),
+                    on_preview=show_preview
+                )
+                graph_preview_container.empty()
             
-            phase_results["extract"] = True
-            progress_container.markdown(get_phase_html(None, phase_results), unsafe_allow_html=True)
-            status_container.success("✓ Knowledge graph extraction complete!")
-            preview_container.empty()
+                phase_results["extract"] = True
+                progress_container.markdown(get_phase_html(None, phase_results), unsafe_allow_html=True)
+                if failed_chunks:
+                    status_container.warning(f"⚠️ Extraction complete, but {failed_chunks} of {total_chunks} chunks failed and were skipped")
+                else:
+                    status_container.success("✓ Knowledge graph extraction complete!")
+                preview_container.empty()
             
-            nodes_data = list(all_nodes.values())
-            edges_data = all_edges
-            chunk_count = total_chunks
+                chunk_count = total_chunks
+                section_count = parse_result['section_count']
+                graph_totals = None
             
             if nodes_data:
+                try:
+                    st.session_state["graph_analysis"] = analyze_graph(nodes_data, edges_data)
+                except requests.RequestException:
+                    st.session_state["graph_analysis"] = None
+                try:
+                    index_entities(nodes_data)
+                    st.session_state["merge_suggestions"] = get_merge_suggestions([n["id"] for n in nodes_data])
+                except requests.RequestException:
+                    st.session_state["merge_suggestions"] = []
                 st.session_state["graph_nodes"] = nodes_data
                 st.session_state["graph_edges"] = edges_data
                 st.session_state["chunk_count"] = chunk_count
-                st.session_state["section_count"] = parse_result['section_count']
+                st.session_state["section_count"] = section_count
+                # Whole-document entity and relation counts when only a view of the graph is kept
+                st.session_state["graph_totals"] = graph_totals
             else:
                 st.warning("⚠️ No entities could be extracted from this PDF.")
                 
@@ -612,15 +849,21 @@ if uploaded_file is not None:
         
         st.markdown("### 📊 Extraction Results")
         
-        col1, col2, col3, col4 = st.columns(4)
+        analysis = st.session_state.get("graph_analysis")
+        community_names = get_community_names(analysis) if analysis else {}
+        
+        col1, col2, col3, col4, col5 = st.columns(5)
         with col1:
             st.metric("📑 Sections", section_count)
         with col2:
             st.metric("📄 Chunks", chunk_count)
+        totals = st.session_state.get("graph_totals") or {}
         with col3:
-            st.metric("🔷 Entities", len(nodes_data))
+            st.metric("🔷 Entities", totals.get("node_count", len(nodes_data)))
         with col4:
-            st.metric("🔗 Relations", len(edges_data))
+            st.metric("🔗 Relations", totals.get("edge_count", len(edges_data)))
+        with col5:
+            st.metric("🧩 Communities", sum(1 for c in analysis["communities"] if c["level"] == 0 and c["size"] > 1) if analysis else "–")
         
         st.markdown("### 🎨 Entity Types")
         legend_cols = st.columns(len(NODE_COLORS))
@@ -633,8 +876,50 @@ if uploaded_file is not None:
         
         st.markdown("### 🕸️ Knowledge Graph")
         
-        agraph_nodes = build_agraph_nodes(nodes_data)
-        agraph_edges = build_agraph_edges(edges_data)
+        pagerank = None
+        groups = None
+        group_options = list(NODE_COLORS)
+        if analysis:
+            community_of = {m["id"]: m["community"] for m in analysis["nodes"]}
+            pagerank = {m["id"]: m["pagerank"] for m in analysis["nodes"]}
+            
+            # Filter: only show entities from the selected communities
+            clusters = sorted(
+                (c for c in analysis["communities"] if c["level"] == 0 and c["size"] > 1),
+                key=lambda c: -c["size"]
+            )
+            focus = st.multiselect(
+                "Focus on communities",
+                options=[c["id"] for c in clusters],
+                format_func=lambda cid: community_names[cid],
+                key="focus_communities"
+            )
+            if focus:
+                focus = set(focus)
+                nodes_data = [n for n in nodes_data if community_of.get(n["id"]) in focus]
+                kept_ids = {n["id"] for n in nodes_data}
+                edges_data = [e for e in edges_data if e["source"] in kept_ids and e["target"] in kept_ids]
+            
+            group_by = st.radio("Group collapsed entities by", ["type", "community"], horizontal=True, key="group_by")
+            if group_by == "community":
+                groups = {n["id"]: community_names[community_of[n["id"]]] for n in nodes_data}
+                group_options = sorted(community_names.values())
+        
+        expand = []
+        if len(nodes_data) > MAX_RENDERED_NODES:
+            st.caption(
+                f"Large graph: showing the {MAX_RENDERED_NODES} most connected entities, "
+                "the others are grouped (◆). Expand a group to see its entities."
+            )
+            expand = st.multiselect(
+                "Expand groups",
+                options=group_options,
+                key="expanded_communities" if groups else "expanded_types"
+            )
+        
+        layout = fetch_graph_layout(nodes_data, edges_data, tuple(expand), groups)
+        agraph_nodes = build_agraph_nodes(layout["nodes"], pagerank)
+        agraph_edges = build_agraph_edges(layout["edges"])
         config = get_graph_config()
         
         agraph(nodes=agraph_nodes, edges=agraph_edges, config=config)
@@ -652,6 +937,42 @@ if uploaded_file is not None:
         with st.expander("🔗 View All Relations"):
             for edge in edges_data:
                 st.markdown(f'`{edge["source"]}` → **{edge["relationship"]}** → `{edge["target"]}`')
+        
+        suggestions = st.session_state.get("merge_suggestions") or []
+        if suggestions:
+            with st.expander(f"🔀 Possible Duplicates ({len(suggestions)})"):
+                for pair in suggestions:
+                    st.markdown(f'**{pair["source_label"]}** ≈ **{pair["target_label"]}** ({pair["score"]:.2f})')
+        
+        st.markdown("### 🔎 Search Entities")
+        query = st.text_input("Search entities", placeholder="e.g. attention mechanism", label_visibility="collapsed")
+        if query:
+            try:
+                for hit in search_entities(query):
+                    color = NODE_COLORS.get(hit["type"], "#888888")
+                    st.markdown(
+                        f'<span style="color:{color};">●</span> **{hit["label"]}** ({hit["type"]}) · {hit["score"]:.2f}',
+                        unsafe_allow_html=True
+                    )
+                    if hit.get("description"):
+                        st.caption(hit["description"])
+            except requests.RequestException as e:
+                st.error(f"❌ Search failed: {e}")
+
+        st.markdown("### 💬 Ask the Corpus")
+        question = st.text_input("Ask the corpus", placeholder="e.g. Which metrics evaluate the Transformer?", label_visibility="collapsed")
+        if question:
+            try:
+                answer = query_corpus(question)
+                for chunk in answer["chunks"]:
+                    with st.expander(f'{chunk["filename"]} · {chunk["section"]} ({", ".join(chunk["matched_by"])})'):
+                        st.markdown(chunk["text"])
+                if answer["edges"]:
+                    st.caption("Related facts")
+                    for edge in answer["edges"][:20]:
+                        st.markdown(f'`{edge["source"]}` → **{edge["relationship"]}** → `{edge["target"]}`')
+            except requests.RequestException as e:
+                st.error(f"❌ Query failed: {e}")
 
 else:
     st.markdown("""
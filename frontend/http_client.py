@@ -0,0 +1,53 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Per-request retries on connection errors, and on read errors for GETs. POSTs are not resent after
+# a read error: the backend may still be working on the first one (an LLM call, an upload).
+# 502/504 are not retried: the backend only returns them after its own retries within the extraction
+# deadline. 429/503 (the backend is at capacity) are reported, not retried, except for chunk
+# extractions asked to wait at most MAX_RETRY_AFTER_SECONDS
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+MAX_RETRY_AFTER_SECONDS = float(os.getenv("MAX_RETRY_AFTER_SECONDS", "5"))
+
+
+def make_http_session(pool_size: int) -> requests.Session:
+    """Keep-alive session whose retries never resend a request the backend answered or may be running"""
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=0.5,
+        allowed_methods=frozenset({"GET"}),
+        status=0,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def check_response(response):
+    """raise_for_status with the backend's error detail; capacity rejections say when to try again"""
+    if response.ok:
+        return
+    try:
+        detail = response.json().get("detail", response.text)
+    except ValueError:
+        detail = response.text
+    if response.status_code in (429, 503) and response.headers.get("Retry-After"):
+        detail = f"{detail} (retry in {response.headers['Retry-After']}s)"
+    raise requests.HTTPError(f"{response.status_code}: {detail}", response=response)
+
+
+def short_retry_after(response):
+    """Seconds to wait before retrying a capacity rejection, or None if it isn't one or the wait is too long"""
+    if response.status_code not in (429, 503):
+        return None
+    try:
+        retry_after = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+    return retry_after if retry_after <= MAX_RETRY_AFTER_SECONDS else None
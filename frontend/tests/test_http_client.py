@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from http_client import check_response, make_http_session  # noqa: E402
+
+
+class StubBackend(BaseHTTPRequestHandler):
+    """Answers every request with the server's `status` and `retry_after`, after `delay` seconds"""
+
+    def _reply(self):
+        self.server.requests += 1
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        time.sleep(self.server.delay)
+        body = b'{"detail": "Server busy"}'
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.retry_after:
+            self.send_header("Retry-After", self.server.retry_after)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def backend():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBackend)
+    server.requests, server.status, server.retry_after, server.delay = 0, 200, None, 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_capacity_rejection_reaches_check_response_on_first_try(backend, status):
+    backend.status, backend.retry_after = status, "2"
+    start = time.monotonic()
+    response = make_http_session(1).post(
+        url(backend, "/parse-pdf"), files={"file": ("a.pdf", b"%PDF-1.4", "application/pdf")}, timeout=10
+    )
+    assert backend.requests == 1
+    assert time.monotonic() - start < 1.0
+    with pytest.raises(requests.HTTPError, match=f"{status}: Server busy \\(retry in 2s\\)"):
+        check_response(response)
+
+
+def test_post_is_not_resent_after_a_read_timeout(backend):
+    backend.delay = 0.5
+    with pytest.raises(requests.Timeout):
+        make_http_session(1).post(url(backend, "/extract-chunk"), json={"chunk": {}}, timeout=0.2)
+    time.sleep(0.5)
+    assert backend.requests == 1